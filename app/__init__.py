@@ -1,6 +1,8 @@
 from flask import Flask
+from .scraper.logs import setup_logging
 
 def create_app():
+    setup_logging()
     app = Flask(__name__)
 
     with app.app_context():
@@ -1,17 +1,162 @@
-from flask import Blueprint, request, jsonify
-from .scraper.norma import Norma, NormaVisitata
-from .scraper.xlm_htmlextractor import extract_html_article
+import json
+import time
+from datetime import datetime, timezone
+from flask import Blueprint, Response, request, jsonify, g
+from .scraper.config import BATCH_MAX_ITEMS
+from .scraper.http_client import UpstreamError
+from .scraper.logs import log_request
+from .scraper import metrics
+from .service import get_service
 
 bp = Blueprint('api', __name__)
 
+@bp.before_request
+def start_request():
+    g.started = time.perf_counter()
+    g.log_fields = {}
+
+@bp.after_request
+def log_request_summary(response):
+    # One structured record per request; streamed responses are timed to the first byte
+    elapsed = time.perf_counter() - g.started
+    rule = request.url_rule.rule if request.url_rule else 'unmatched'
+    metrics.REQUEST_SECONDS.labels(request.method, rule, str(response.status_code)).observe(elapsed)
+    log_request(f"{request.method} {request.path}", status=response.status_code,
+                duration_ms=round(elapsed * 1000, 1), **g.log_fields)
+    return response
+
+@bp.route('/metrics', methods=['GET'])
+def metrics_route():
+    """
+    Exposes stage timings, cache and upstream counters in the Prometheus text format.
+    """
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @bp.route('/scrape', methods=['POST'])
 def scrape():
-    data = request.json
-    tipo_atto = data['tipo_atto']
-    norma = Norma(tipo_atto, data.get('data'), data.get('numero_atto'))
-    norma_visitata = NormaVisitata(norma, data['numero_articolo'], data.get('versione', 'vigente'), data.get('data_versione'))
-    html_content = extract_html_article(norma_visitata)
-    response_data = norma_visitata.to_dict()
-    response_data['html'] = html_content
-    response_data['tree'] = norma_visitata.tree
-    return jsonify(response_data)
+    """
+    Extracts an article and the tree of its act.
+
+    With ?stale=1 the answer comes at once from the cached page even if it
+    has expired, and the page is refreshed in the background; the Age,
+    X-Fetched-At and X-Cache (HIT, STALE or MISS) headers describe the data.
+    """
+    data = request.json or {}
+    g.log_fields.update(tipo_atto=data.get('tipo_atto'), numero_articolo=data.get('numero_articolo'))
+    try:
+        if request.args.get('stale', '').lower() in ('1', 'true', 'yes'):
+            response_data, fetched_at, status = get_service().scrape_stale(data)
+            g.log_fields['cache'] = status
+            response = jsonify(response_data)
+            response.headers['Age'] = str(int(max(0, time.time() - fetched_at)))
+            response.headers['X-Fetched-At'] = datetime.fromtimestamp(fetched_at, timezone.utc).isoformat()
+            response.headers['X-Cache'] = status.upper()
+            return response
+        return jsonify(get_service().scrape(data))
+    except KeyError as e:
+        return jsonify({'error': f"Campo mancante: {e}"}), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except UpstreamError as e:
+        g.log_fields['error'] = str(e)
+        return jsonify({'error': str(e)}), 502
+
+@bp.route('/search', methods=['GET'])
+def search():
+    """
+    Full-text search over the articles extracted so far, ranked by relevance.
+
+    Query parameters: q (words and "quoted phrases"; word* matches prefixes),
+    and optionally tipo_atto, data, numero_atto, articolo, versione and limit.
+    """
+    query = request.args.get('q', '')
+    filters = {key: request.args.get(key) for key in ('tipo_atto', 'data', 'numero_atto', 'articolo', 'versione')}
+    g.log_fields.update(query=query, tipo_atto=filters['tipo_atto'])
+    try:
+        results = get_service().search(query, limit=request.args.get('limit', 20, type=int), **filters)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 503
+    g.log_fields['results'] = len(results)
+    return jsonify({'query': query, 'count': len(results), 'results': results})
+
+@bp.route('/scrape/batch', methods=['POST'])
+def scrape_batch_route():
+    data = request.json or {}
+    items = data.get('items')
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': "'items' deve essere una lista non vuota"}), 400
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({'error': f"Massimo {BATCH_MAX_ITEMS} articoli per richiesta"}), 400
+    if not all(isinstance(item, dict) for item in items):
+        return jsonify({'error': "Ogni elemento di 'items' deve essere un oggetto"}), 400
+
+    results = get_service().scrape_batch(items)
+    errors = sum(1 for result in results if 'error' in result)
+    g.log_fields.update(items=len(items), errors=errors)
+    return jsonify({
+        'results': results,
+        'errors': errors,
+    })
+
+@bp.route('/scrape/stream', methods=['POST'])
+def scrape_stream():
+    """
+    Streams articles as NDJSON, one line per article as soon as it is extracted.
+
+    The body is either {'items': [...]} like /scrape/batch, or an act
+    (tipo_atto, data, numero_atto, versione, data_versione) to export all of
+    its articles. Article lines carry the 'index' of the item; the stream
+    ends with a {'done': true} summary line.
+    """
+    data = request.json or {}
+    header = None
+    if 'items' in data:
+        items = data['items']
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            return jsonify({'error': "'items' deve essere una lista di oggetti"}), 400
+    elif 'tipo_atto' in data:
+        try:
+            tree, items = get_service().act_items(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except UpstreamError as e:
+            return jsonify({'error': str(e)}), 502
+        header = {'tree': tree, 'total': len(items)}
+    else:
+        return jsonify({'error': "Specificare 'items' oppure 'tipo_atto'"}), 400
+
+    def generate():
+        if header:
+            yield json.dumps(header) + '\n'
+        errors = 0
+        for index, result in get_service().iter_batch(items):
+            errors += 'error' in result
+            result['index'] = index
+            yield json.dumps(result) + '\n'
+        yield json.dumps({'done': True, 'total': len(items), 'errors': errors}) + '\n'
+
+    return Response(generate(), mimetype='application/x-ndjson', headers={'X-Accel-Buffering': 'no'})
+
+@bp.route('/mirror', methods=['POST'])
+def mirror():
+    """
+    Mirrors every article of an act on the server, streaming NDJSON progress events.
+
+    Interrupted mirrors resume from the missing articles when requested again.
+    """
+    data = request.json or {}
+    if 'tipo_atto' not in data:
+        return jsonify({'error': "Specificare 'tipo_atto'"}), 400
+    act = {key: data.get(key) for key in ('tipo_atto', 'data', 'numero_atto', 'versione', 'data_versione')}
+    act['versione'] = act['versione'] or 'vigente'
+
+    def generate():
+        try:
+            for event in get_service().mirror_act(act):
+                yield json.dumps(event) + '\n'
+        except (ValueError, UpstreamError) as e:
+            yield json.dumps({'event': 'error', 'error': str(e)}) + '\n'
+
+    return Response(generate(), mimetype='application/x-ndjson', headers={'X-Accel-Buffering': 'no'})
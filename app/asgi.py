@@ -0,0 +1,97 @@
+import json
+import time
+import logging
+from .scraper.config import BATCH_MAX_ITEMS
+from .scraper.http_client import UpstreamError
+from .service import get_service
+from .scraper.logs import setup_logging, log_request
+
+# ASGI entry point exposing the scraping API on the asyncio core, so that a
+# single process can keep hundreds of upstream fetches in flight.
+# Run it with an ASGI server, e.g.: uvicorn app.asgi:app
+
+setup_logging()
+
+async def _read_json(receive):
+    body = b''
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get('body', b'')
+        more_body = message.get('more_body', False)
+    return json.loads(body or b'{}')
+
+async def _send_json(send, status, content):
+    payload = json.dumps(content).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(payload)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': payload})
+
+async def scrape(data):
+    return 200, await get_service().scrape_async(data)
+
+async def scrape_batch(data):
+    items = data.get('items')
+    if not isinstance(items, list) or not items:
+        return 400, {'error': "'items' deve essere una lista non vuota"}
+    if len(items) > BATCH_MAX_ITEMS:
+        return 400, {'error': f"Massimo {BATCH_MAX_ITEMS} articoli per richiesta"}
+    if not all(isinstance(item, dict) for item in items):
+        return 400, {'error': "Ogni elemento di 'items' deve essere un oggetto"}
+    results = await get_service().scrape_batch_async(items)
+    return 200, {'results': results, 'errors': sum(1 for result in results if 'error' in result)}
+
+ROUTES = {
+    ('POST', '/scrape'): scrape,
+    ('POST', '/scrape/batch'): scrape_batch,
+}
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            from .scraper import aio
+            await aio.close()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+
+    started = time.perf_counter()
+    status, content = await _handle(scope, receive)
+    await _send_json(send, status, content)
+    # One structured record per request
+    log_request(f"{scope['method']} {scope['path']}", status=status,
+                duration_ms=round((time.perf_counter() - started) * 1000, 1))
+
+async def _handle(scope, receive):
+    handler = ROUTES.get((scope['method'], scope['path']))
+    if handler is None:
+        return 404, {'error': 'Not found'}
+    try:
+        data = await _read_json(receive)
+    except ValueError:
+        return 400, {'error': 'JSON non valido'}
+    if not isinstance(data, dict):
+        return 400, {'error': 'JSON non valido'}
+
+    try:
+        return await handler(data)
+    except KeyError as e:
+        return 400, {'error': f"Campo mancante: {e}"}
+    except ValueError as e:
+        return 400, {'error': str(e)}
+    except UpstreamError as e:
+        return 502, {'error': str(e)}
+    except Exception as e:
+        logging.error("Error handling %s: %s", scope['path'], e, exc_info=True)
+        return 500, {'error': str(e)}
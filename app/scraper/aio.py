@@ -0,0 +1,287 @@
+# Asynchronous versions of the fetch and extract functions, built on aiohttp.
+# Each event loop gets its own aiohttp session with at most ASYNC_MAX_CONCURRENCY
+# upstream requests in flight; parsing runs in the default executor so that the
+# loop is never blocked. The document cache and the parsing code are shared
+# with the synchronous functions.
+import time
+import asyncio
+import logging
+import weakref
+import aiohttp
+from .config import HTTP_TIMEOUT, HTTP_USER_AGENT, ASYNC_MAX_CONCURRENCY, ASYNC_MAX_CONNECTIONS_PER_HOST
+from .config import HTTP_RETRIES
+from .http_client import ACCEPT_ENCODING, RETRY_STATUSES, UpstreamError, backoff_delay, check_circuit, record_upstream, upstream_url
+from .metrics import timed, DOCUMENT_CACHE
+from .doc_cache import get_document_cache, revalidation_headers, store
+from .search_index import index_article
+from .ratelimit import get_host_limiter, retry_after_seconds
+from .parsing import parse_html
+from .treextractor import estrai_albero
+from .xlm_htmlextractor import estrai_articolo, estrai_articolo_e_albero
+from .brocardi import BrocardiScraper
+from .norma import NormaVisitata
+from .batch import norma_visitata_from_request, plan_batch, tree_sources, assemble_batch, error_result, act_key
+
+class _LoopState:
+    def __init__(self):
+        connector = aiohttp.TCPConnector(limit=ASYNC_MAX_CONCURRENCY, limit_per_host=ASYNC_MAX_CONNECTIONS_PER_HOST, ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(sock_connect=HTTP_TIMEOUT[0], sock_read=HTTP_TIMEOUT[1])
+        headers = {"User-Agent": HTTP_USER_AGENT, "Accept-Encoding": ACCEPT_ENCODING}
+        self.session = aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers)
+        self.semaphore = asyncio.Semaphore(ASYNC_MAX_CONCURRENCY)
+        self.inflight = {}
+
+_states = weakref.WeakKeyDictionary()
+
+def _state():
+    loop = asyncio.get_running_loop()
+    state = _states.get(loop)
+    if state is None:
+        state = _states[loop] = _LoopState()
+    return state
+
+async def close():
+    """
+    Closes the aiohttp session of the running event loop.
+    """
+    state = _states.pop(asyncio.get_running_loop(), None)
+    if state is not None:
+        await state.session.close()
+
+async def get(url, retries=HTTP_RETRIES, **kwargs):
+    """
+    Esegue una GET asincrona sulla sessione condivisa, rispettando i limiti
+    di frequenza e di concorrenza dell'host, con gli stessi retry e circuit
+    breaker di http_client.get.
+
+    Returns:
+    tuple -- (status code, response text, response headers)
+
+    Raises:
+    UpstreamError -- If the host cannot be reached or its circuit is open
+    """
+    for attempt in range(retries + 1):
+        breaker, trial = check_circuit(url)
+        try:
+            status, text, headers = await _send(url, **kwargs)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            breaker.record_failure()
+            if attempt == retries:
+                raise UpstreamError(f"Failed to reach {url}: {e!r}") from e
+            logging.warning("Request to %s failed (%r), retrying", url, e)
+        else:
+            if status not in RETRY_STATUSES:
+                breaker.record_success()
+                return status, text, headers
+            # Throttling alone does not open the circuit, but a throttled trial keeps it open
+            if status != 429 or trial:
+                breaker.record_failure()
+            if attempt == retries:
+                return status, text, headers
+            logging.warning("Request to %s answered %s, retrying", url, status)
+        finally:
+            # Cancelled before an outcome: the trial must not leave the circuit half-open
+            if trial:
+                breaker.release_trial()
+        await asyncio.sleep(backoff_delay(attempt))
+
+async def _send(url, **kwargs):
+    state = _state()
+    limiter = get_host_limiter(url)
+    while True:
+        wait = limiter.try_acquire()
+        if not wait:
+            break
+        await asyncio.sleep(wait)
+    started = time.monotonic()
+    status = retry_after = None
+    cancelled = False
+    try:
+        async with state.semaphore:
+            async with state.session.get(upstream_url(url), **kwargs) as response:
+                status = response.status
+                retry_after = retry_after_seconds(response.headers.get("Retry-After"))
+                return status, await response.text(), response.headers
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        raise
+    except BaseException:
+        # Cancelled (or interrupted on our side): says nothing about the host
+        cancelled = True
+        raise
+    finally:
+        elapsed = time.monotonic() - started
+        limiter.release(elapsed, status, retry_after, cancelled=cancelled)
+        if not cancelled:
+            record_upstream(url, status, elapsed)
+
+async def _download(urn, cache, entry=None):
+    with timed("fetch"):
+        status, html, headers = await get(urn, headers=revalidation_headers(entry))
+    if status == 304 and entry is not None:
+        logging.debug("Document revalidated: %s", urn)
+        DOCUMENT_CACHE.labels("revalidated").inc()
+        await asyncio.to_thread(cache.revalidated, urn)
+        return entry.html
+    if status != 200:
+        raise UpstreamError(f"Failed to retrieve the page, status code: {status}", status=status)
+    if cache is not None:
+        await asyncio.to_thread(store, cache, urn, html, headers)
+    return html
+
+async def fetch_document(urn):
+    """
+    Asynchronous counterpart of doc_cache.fetch_document.
+    """
+    cache = get_document_cache()
+    entry = None
+    if cache is not None:
+        entry = await asyncio.to_thread(cache.lookup, urn)
+        if entry is not None and cache.is_fresh(urn, entry.fetched_at):
+            DOCUMENT_CACHE.labels("hit").inc()
+            return entry.html
+        DOCUMENT_CACHE.labels("miss" if entry is None else "expired").inc()
+
+    # Concurrent requests for the same URN share a single download
+    state = _state()
+    task = state.inflight.get(urn)
+    if task is None:
+        task = state.inflight[urn] = asyncio.ensure_future(_download(urn, cache, entry))
+        task.add_done_callback(lambda _: state.inflight.pop(urn, None))
+    return await asyncio.shield(task)
+
+async def _parse(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+async def get_tree(normurn, link=False):
+    """
+    Asynchronous counterpart of treextractor.get_tree.
+    """
+    try:
+        return await fetch_tree(normurn, link)
+    except UpstreamError as e:
+        return str(e)
+
+async def fetch_tree(normurn, link=False):
+    """
+    Asynchronous counterpart of treextractor.fetch_tree (not memoized).
+    """
+    html = await fetch_document(normurn)
+    doc = await _parse(parse_html, html)
+    return await _parse(estrai_albero, doc, normurn, link)
+
+async def extract_html_article(norma_visitata):
+    """
+    Asynchronous counterpart of xlm_htmlextractor.extract_html_article.
+    """
+    urn = norma_visitata.get_urn()
+    try:
+        html = await fetch_document(urn)
+        html_article = await _parse(estrai_articolo, html)
+    except UpstreamError as e:
+        logging.warning("Failed to fetch HTML content: %s", e)
+        return None
+    except Exception as e:
+        logging.error("Error fetching HTML content: %s", e, exc_info=True)
+        return None
+    await asyncio.to_thread(index_article, urn, html_article)
+    return html_article
+
+async def extract_article_and_tree(norma_visitata, link=False):
+    """
+    Asynchronous counterpart of xlm_htmlextractor.extract_article_and_tree.
+    """
+    try:
+        return await fetch_article_and_tree(norma_visitata.get_urn(), link)
+    except UpstreamError as e:
+        logging.warning("Failed to fetch HTML content: %s", e)
+        return None, str(e)
+    except Exception as e:
+        logging.error("Error fetching HTML content: %s", e, exc_info=True)
+        return None, f"Failed to retrieve the page: {e}"
+
+async def fetch_article_and_tree(urn, link=False):
+    """
+    Asynchronous counterpart of xlm_htmlextractor.fetch_article_and_tree (not memoized).
+    """
+    html = await fetch_document(urn)
+    html_article, tree = await _parse(estrai_articolo_e_albero, html, urn, link)
+    await asyncio.to_thread(index_article, urn, html_article)
+    return html_article, tree
+
+async def get_brocardi_info(norma, scraper=None):
+    """
+    Asynchronous counterpart of BrocardiScraper.get_info.
+    """
+    scraper = scraper or BrocardiScraper()
+    if isinstance(norma, NormaVisitata):
+        norma_link = scraper.look_up(norma)
+        if norma_link:
+            status, html, _ = await get(norma_link)
+            if status == 200:
+                logging.debug("Fetching information from: %s", norma_link)
+                position, info = await _parse(scraper.estrai_info, html)
+                return position, info, norma_link
+        else:
+            logging.warning("No link found for the norma")
+    return None, {}, None
+
+async def scrape(data):
+    """
+    Asynchronous counterpart of ScrapingService.scrape.
+    """
+    # URN generation may need to complete dates with a browser, so it runs in a thread
+    norma_visitata = await asyncio.to_thread(norma_visitata_from_request, data)
+    html = await fetch_document(norma_visitata.get_urn())
+    html_content, norma_visitata.tree = await _parse(estrai_articolo_e_albero, html, norma_visitata.get_urn(), False)
+    await asyncio.to_thread(index_article, norma_visitata.get_urn(), html_content)
+    response_data = norma_visitata.to_dict()
+    response_data['html'] = html_content
+    return response_data
+
+async def scrape_batch(items):
+    """
+    Asynchronous counterpart of batch.scrape_batch: every distinct URN is
+    fetched concurrently, bounded only by ASYNC_MAX_CONCURRENCY.
+    """
+    results = [None] * len(items)
+    built = await asyncio.gather(*(asyncio.to_thread(norma_visitata_from_request, item) for item in items),
+                                 return_exceptions=True)
+    norme = []
+    for index, norma_visitata in enumerate(built):
+        if isinstance(norma_visitata, Exception):
+            results[index] = error_result(items[index], f"Richiesta non valida: {norma_visitata}")
+            norme.append(None)
+        else:
+            norme.append(norma_visitata)
+
+    by_urn, tree_owners = plan_batch(norme)
+    owner_urns = set(tree_owners.values())
+    urns = list(by_urn)
+    fetched = await asyncio.gather(*(
+        fetch_article_and_tree(urn) if urn in owner_urns else extract_html_article(by_urn[urn])
+        for urn in urns), return_exceptions=True)
+
+    articles = {}
+    trees = {}
+    errors = {}
+    for urn, result in zip(urns, fetched):
+        if isinstance(result, UpstreamError):
+            logging.warning("Failed to fetch %s: %s", urn, result)
+            articles[urn], errors[urn] = None, str(result)
+        elif isinstance(result, Exception):
+            logging.error("Error fetching %s: %s", urn, result)
+            articles[urn], errors[urn] = None, f"Errore generico: {result}"
+        elif urn in owner_urns:
+            articles[urn], trees[act_key(by_urn[urn])] = result
+        else:
+            articles[urn] = result
+
+    sources = tree_sources(norme, articles, trees)
+    fetched = await asyncio.gather(*(fetch_tree(urn) for urn in sources.values()), return_exceptions=True)
+    for key, tree in zip(sources, fetched):
+        if isinstance(tree, Exception):
+            logging.warning("Failed to fetch the tree of %s: %s", sources[key], tree)
+        else:
+            trees[key] = tree
+
+    return assemble_batch(items, norme, results, articles, trees, errors)
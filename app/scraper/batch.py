@@ -0,0 +1,291 @@
+import logging
+import requests
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from .config import BATCH_MAX_WORKERS, STREAM_WINDOW
+from .norma import Norma, NormaVisitata
+from .treextractor import fetch_tree, articoli_da_albero
+from .xlm_htmlextractor import extract_html_article, fetch_article_and_tree
+
+def norma_visitata_from_request(data):
+    """
+    Builds a NormaVisitata from a /scrape request payload.
+    
+    Arguments:
+    data -- Dictionary with tipo_atto, numero_articolo and optionally data,
+            numero_atto, versione and data_versione
+    
+    Returns:
+    NormaVisitata -- The visited norm
+    
+    Raises:
+    KeyError -- If tipo_atto or numero_articolo is missing
+    ValueError -- If the URN cannot be generated (e.g. the date of the act cannot be completed)
+    """
+    norma = Norma(data['tipo_atto'], data.get('data'), data.get('numero_atto'))
+    return check_urn(NormaVisitata(norma, data['numero_articolo'], data.get('versione', 'vigente'), data.get('data_versione')))
+
+def check_urn(norma_visitata):
+    """
+    Returns norma_visitata, or raises ValueError if its URN could not be generated.
+    """
+    if not isinstance(norma_visitata.get_urn(), str):
+        raise ValueError(f"Atto non riconosciuto: {norma_visitata}, indicare data e numero dell'atto")
+    return norma_visitata
+
+def act_key(norma_visitata):
+    """
+    Key shared by all the articles of the same act and version, which share the same tree.
+    """
+    return (norma_visitata.tipo_atto_urn, norma_visitata.data, norma_visitata.numero_atto,
+            norma_visitata.versione, norma_visitata.data_versione)
+
+def error_result(item, message):
+    """
+    Builds the result of a batch item that could not be extracted.
+    """
+    return {'error': message, 'request': item}
+
+def plan_batch(norme):
+    """
+    Deduplicates the URNs of a batch and elects, for every act, the article that parses the tree.
+    
+    Arguments:
+    norme -- List of NormaVisitata (None for invalid items)
+    
+    Returns:
+    tuple -- (dict URN -> NormaVisitata, dict act key -> URN of the tree owner)
+    """
+    by_urn = {}
+    tree_owners = {}
+    for norma_visitata in norme:
+        if norma_visitata is None:
+            continue
+        urn = norma_visitata.get_urn()
+        if urn not in by_urn:
+            by_urn[urn] = norma_visitata
+            tree_owners.setdefault(act_key(norma_visitata), urn)
+    logging.info("Batch deduplicated to %s URNs over %s acts", len(by_urn), len(tree_owners))
+    return by_urn, tree_owners
+
+def tree_sources(norme, articles, trees):
+    """
+    Elects, for every act left without a tree because its tree owner failed,
+    another extracted article of the act to take the tree from.
+    
+    Arguments:
+    norme -- List of NormaVisitata (None for invalid items)
+    articles -- Dict URN -> article text (None if not found)
+    trees -- Dict act key -> tree, for the acts whose tree was extracted
+    
+    Returns:
+    dict -- Act key -> URN of the article to fetch the tree from
+    """
+    sources = {}
+    for norma_visitata in norme:
+        if norma_visitata is None:
+            continue
+        key = act_key(norma_visitata)
+        if key not in trees and articles[norma_visitata.get_urn()] is not None:
+            sources.setdefault(key, norma_visitata.get_urn())
+    return sources
+
+def assemble_batch(items, norme, results, articles, trees, errors):
+    """
+    Fills `results` with the /scrape response of every valid item, in request order.
+    
+    Arguments:
+    items -- List of /scrape request payloads
+    norme -- List of NormaVisitata (None for invalid items, whose result is already set)
+    results -- List of results to fill
+    articles -- Dict URN -> article text (None if not found)
+    trees -- Dict act key -> tree (acts without a tree get None)
+    errors -- Dict URN -> error message, for the failed fetches
+    
+    Returns:
+    list -- The filled results
+    """
+    for index, norma_visitata in enumerate(norme):
+        if norma_visitata is None:
+            continue
+        urn = norma_visitata.get_urn()
+        html_content = articles[urn]
+        if html_content is None:
+            results[index] = error_result(items[index], errors.get(urn) or f"Articolo non trovato: {urn}")
+            continue
+        # The tree is set here: NormaVisitata.tree would fetch a missing one
+        response_data = norma_visitata.to_dict(include_tree=False)
+        response_data['tree'] = trees.get(act_key(norma_visitata))
+        response_data['html'] = html_content
+        results[index] = response_data
+    return results
+
+def scrape_batch(items, max_workers=BATCH_MAX_WORKERS):
+    """
+    Estrae un insieme di articoli in parallelo.
+    
+    Articles with the same URN are fetched once, and the tree of each act is
+    parsed only from the first of its articles and shared with the others.
+    If that article fails, the tree is fetched for another article of the act.
+    
+    Arguments:
+    items -- List of /scrape request payloads
+    max_workers -- Maximum number of concurrent upstream fetches
+    
+    Returns:
+    list -- One result per item, in request order: the /scrape response
+            dictionary, or a dictionary with an 'error' key
+    """
+    logging.info("Starting batch of %s items with %s workers", len(items), max_workers)
+    results = [None] * len(items)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # URN generation may need to complete dates online, so it runs in the pool too
+        futures = [executor.submit(norma_visitata_from_request, item) for item in items]
+        norme = []
+        for index, future in enumerate(futures):
+            try:
+                norme.append(future.result())
+            except Exception as e:
+                logging.warning("Invalid batch item %s: %s", index, e)
+                results[index] = error_result(items[index], f"Richiesta non valida: {e}")
+                norme.append(None)
+
+        by_urn, tree_owners = plan_batch(norme)
+        owner_urns = set(tree_owners.values())
+        fetches = {}
+        for urn, norma_visitata in by_urn.items():
+            if urn in owner_urns:
+                fetches[urn] = executor.submit(fetch_article_and_tree, urn)
+            else:
+                fetches[urn] = executor.submit(extract_html_article, norma_visitata)
+
+        articles = {}
+        trees = {}
+        errors = {}
+        for urn, future in fetches.items():
+            try:
+                if urn in owner_urns:
+                    articles[urn], trees[act_key(by_urn[urn])] = future.result()
+                else:
+                    articles[urn] = future.result()
+            except requests.HTTPError as e:
+                logging.warning("Failed to fetch %s: %s", urn, e)
+                articles[urn], errors[urn] = None, str(e)
+            except Exception as e:
+                logging.error("Error fetching %s: %s", urn, e, exc_info=True)
+                articles[urn], errors[urn] = None, f"Errore generico: {e}"
+
+        sources = tree_sources(norme, articles, trees)
+        tree_fetches = {key: executor.submit(fetch_tree, urn) for key, urn in sources.items()}
+        for key, future in tree_fetches.items():
+            try:
+                trees[key] = future.result()
+            except Exception as e:
+                logging.warning("Failed to fetch the tree of %s: %s", sources[key], e)
+
+    return assemble_batch(items, norme, results, articles, trees, errors)
+
+def scrape_item(item):
+    """
+    Estrae un singolo articolo, senza l'albero dell'atto.
+    
+    Arguments:
+    item -- A /scrape request payload
+    
+    Returns:
+    dict -- The /scrape response dictionary without 'tree', or a dictionary with an 'error' key
+    """
+    try:
+        norma_visitata = norma_visitata_from_request(item)
+    except Exception as e:
+        return error_result(item, f"Richiesta non valida: {e}")
+    html_content = extract_html_article(norma_visitata)
+    if html_content is None:
+        return error_result(item, f"Articolo non trovato: {norma_visitata.get_urn()}")
+    response_data = norma_visitata.to_dict(include_tree=False)
+    response_data['html'] = html_content
+    return response_data
+
+def iter_batch(items, max_workers=BATCH_MAX_WORKERS, window=STREAM_WINDOW, scrape=scrape_item):
+    """
+    Estrae un insieme di articoli restituendoli man mano che sono pronti.
+    
+    At most `window` articles are in flight or waiting to be consumed, so a
+    slow consumer slows down the upstream fetches instead of piling up
+    results in memory. Closing the generator cancels the pending work.
+    
+    Arguments:
+    items -- Iterable of /scrape request payloads
+    max_workers -- Maximum number of concurrent upstream fetches
+    window -- Maximum number of articles in flight
+    scrape -- Function extracting a single item (default: scrape_item)
+    
+    Yields:
+    tuple -- (item index, result) in completion order
+    """
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    pending = {}
+    items = enumerate(items)
+
+    def fill():
+        for index, item in items:
+            pending[executor.submit(scrape, item)] = index
+            if len(pending) >= window:
+                break
+
+    try:
+        fill()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future.result()
+            fill()
+    finally:
+        if pending:
+            logging.info("Batch stream closed with %s articles pending, cancelling", len(pending))
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def act_from_request(data):
+    """
+    Builds the NormaVisitata of a whole act (no article) from a request payload.
+    
+    Arguments:
+    data -- Dictionary with tipo_atto and optionally data, numero_atto,
+            versione and data_versione
+    
+    Returns:
+    NormaVisitata -- The act
+    
+    Raises:
+    ValueError -- If the URN of the act cannot be generated (e.g. its date cannot be completed)
+    """
+    norma = Norma(data['tipo_atto'], data.get('data'), data.get('numero_atto'))
+    return check_urn(NormaVisitata(norma, None, data.get('versione', 'vigente'), data.get('data_versione')))
+
+def act_items(data):
+    """
+    Elenca gli articoli di un atto come payload /scrape.
+    
+    Arguments:
+    data -- Dictionary with tipo_atto and optionally data, numero_atto,
+            versione and data_versione
+    
+    Returns:
+    tuple -- (tree of the act, list of /scrape request payloads)
+    
+    Raises:
+    ValueError -- If the act cannot be identified
+    http_client.UpstreamError -- If the tree of the act cannot be fetched
+    """
+    tree = fetch_tree(act_from_request(data).get_urn())
+    items = [{
+        'tipo_atto': data['tipo_atto'],
+        'data': data.get('data'),
+        'numero_atto': data.get('numero_atto'),
+        'numero_articolo': articolo,
+        'versione': data.get('versione', 'vigente'),
+        'data_versione': data.get('data_versione'),
+    } for articolo in articoli_da_albero(tree)]
+    return tree, items
@@ -0,0 +1,93 @@
+import time
+import logging
+import threading
+from urllib.parse import urlsplit
+from .config import BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_TIMEOUT
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+class CircuitBreaker:
+    """
+    Stops sending requests to a host that keeps failing.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    requests are refused without touching the network. Once `reset_timeout`
+    seconds have passed a single trial request is let through: if it
+    succeeds the circuit closes again, otherwise it stays open for another
+    `reset_timeout`.
+    """
+    def __init__(self, name, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.lock = threading.Lock()
+
+    def start(self):
+        """
+        Checks whether a request may be sent.
+
+        Returns:
+        str -- CLOSED for a normal request, HALF_OPEN for the trial request,
+               or None while the circuit is open
+        """
+        with self.lock:
+            if self.state == CLOSED:
+                return CLOSED
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                logging.info("Circuit for %s half-open, sending a trial request", self.name)
+                self.state = HALF_OPEN
+                return HALF_OPEN
+            return None
+
+    def retry_in(self):
+        """
+        Returns the seconds left before the circuit lets a trial request through.
+        """
+        with self.lock:
+            if self.state == CLOSED:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        with self.lock:
+            if self.state != CLOSED:
+                logging.info("Circuit for %s closed", self.name)
+            self.state = CLOSED
+            self.failures = 0
+
+    def release_trial(self):
+        """
+        Called when the trial request ends without an outcome (e.g. cancelled):
+        the circuit goes back to open, ready to let another trial through.
+        """
+        with self.lock:
+            if self.state == HALF_OPEN:
+                self.state = OPEN
+                self.opened_at = time.monotonic() - self.reset_timeout
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                logging.warning("Circuit for %s open after %s failures", self.name, self.failures)
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(url):
+    """
+    Returns the circuit breaker shared by all the requests to the host of `url`.
+    """
+    host = urlsplit(url).hostname or ''
+    breaker = _breakers.get(host)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(host, CircuitBreaker(host))
+    return breaker
@@ -1,20 +1,67 @@
 import re
 import os
 import logging
-from bs4 import BeautifulSoup
-from .map import BROCARDI_CODICI, BROCARDI_MAP
+from functools import lru_cache
+from .metrics import register_cache, timed
+from .map import BROCARDI_CODICI
 from .norma import NormaVisitata
 from .text_op import normalize_act_type
-import requests
+from .config import MAX_CACHE_SIZE
+from .parsing import parse_html, find, has_class, get_text
+from . import http_client
 
-# Configure logging
-logging.basicConfig(level=logging.INFO,
-                    format='%(asctime)s %(levelname)s %(message)s',
-                    handlers=[logging.FileHandler("brocardi_scraper.log"),
-                              logging.StreamHandler()])
 
 CURRENT_APP_PATH = os.path.dirname(os.path.abspath(__file__))
 
+# Matches article pages: captures the code base URL and the article number + extension
+ARTICLE_URL_PATTERN = re.compile(r"^(https://www\.brocardi\.it/[^/]+/).*art([^/]+)\.html")
+
+@register_cache
+@lru_cache(maxsize=None)
+def article_index():
+    """
+    Builds the article lookup index over BROCARDI_MAP.
+    
+    Returns:
+    dict -- Maps (code base URL, article number + extension) to the article URL
+    """
+    from .map import BROCARDI_MAP  # loaded lazily on first access
+
+    index = {}
+    for url in BROCARDI_MAP.values():
+        match = ARTICLE_URL_PATTERN.match(url.lower())
+        if match:
+            # Keep the first URL, as the former linear scan did
+            index.setdefault(match.groups(), url)
+    logging.debug("Brocardi article index built: %s entries", len(index))
+    return index
+
+@register_cache
+@lru_cache(maxsize=None)
+def codici_index():
+    """
+    Returns BROCARDI_CODICI as a tuple of (lowercase name, name, link).
+    """
+    return tuple((txt.lower(), txt, link) for txt, link in BROCARDI_CODICI.items())
+
+@register_cache
+@lru_cache(maxsize=MAX_CACHE_SIZE)
+def find_codice(strcmp):
+    """
+    Finds the first code in BROCARDI_CODICI whose name contains the search string.
+    
+    Arguments:
+    strcmp -- The search string
+    
+    Returns:
+    tuple -- (name, link) or None if no code matches
+    """
+    needle = strcmp.lower()
+    for txt_lower, txt, link in codici_index():
+        if needle in txt_lower:
+            return txt, link
+    return None
+
 class BrocardiScraper:
     """
     Scraper for Brocardi.it to search for legal terms and provide links.
@@ -23,15 +70,21 @@ class BrocardiScraper:
         """
         Initialize the scraper by loading the brocardi links from a JSON file.
         """
-        logging.info("Initializing BrocardiScraper")
-        self.knowledge = [BROCARDI_CODICI, BROCARDI_MAP]
+        logging.debug("Initializing BrocardiScraper")
+
+    @property
+    def knowledge(self):
+        """
+        The brocardi tables: [BROCARDI_CODICI, BROCARDI_MAP]. BROCARDI_MAP is loaded on first access.
+        """
+        from .map import BROCARDI_MAP
+        return [BROCARDI_CODICI, BROCARDI_MAP]
 
     def do_know(self, norma):
         if isinstance(norma, NormaVisitata):
-            atts = norma.to_dict()
-            data_atto = atts['data']
-            numero_atto = atts['numero_atto'] 
-            tipo_atto = atts['tipo_atto']
+            data_atto = norma.data
+            numero_atto = norma.numero_atto
+            tipo_atto = norma.tipo_atto_str
             if not tipo_atto:
                 raise Exception("TIPO ATTO NON INSERITO")
             
@@ -42,18 +95,18 @@ class BrocardiScraper:
             if numero_atto:
                 components.append(f"n. {numero_atto}")
             strcmp = " ".join(components)
-            logging.info(f"Searching for: {strcmp}")
+            logging.debug("Searching for: %s", strcmp)
             
         elif isinstance(norma, str):
             strcmp = norma
         else:
             raise Exception("Formato norma non valido")
         
-        for txt, link in self.knowledge[0].items():
-            if strcmp.lower() in txt.lower():
-                logging.info(f"Found match: {txt} -> {link}")
-                return txt, link
-        logging.warning(f"No match found for: {strcmp}")
+        match = find_codice(strcmp)
+        if match:
+            logging.debug("Found match: %s -> %s", match[0], match[1])
+            return match
+        logging.warning("No match found for: %s", strcmp)
         return False
         
     def look_up(self, norma):
@@ -61,19 +114,15 @@ class BrocardiScraper:
             norma_info = self.do_know(norma)
             if norma_info:
                 link = norma_info[1]
-                numero_articolo = norma.to_dict()['numero_articolo']
-                if '-' in numero_articolo:
-                    numero_articolo = numero_articolo.replace('-', '')
-                logging.info(f"Looking up article number: {numero_articolo}")
-                
-                components = [link, f"art{numero_articolo}.html" if numero_articolo else None]
-                start, end = components[0], components[1]
-                pattern = re.compile(re.escape(start) + r".*" + re.escape(end))
-
-                for key, value in self.knowledge[1].items():
-                    if re.search(pattern, value.lower()):
-                        logging.info(f"Match found: {value}")
-                        return value
+                numero_articolo = norma.numero_articolo
+                if numero_articolo:
+                    numero_articolo = numero_articolo.replace('-', '').lower()
+                logging.debug("Looking up article number: %s", numero_articolo)
+
+                value = article_index().get((link.lower(), numero_articolo))
+                if value:
+                    logging.debug("Match found: %s", value)
+                    return value
 
                 logging.warning("No match found.")
             else:
@@ -85,53 +134,59 @@ class BrocardiScraper:
         if isinstance(norma, NormaVisitata):
             norma_link = self.look_up(norma)
             if norma_link:
-                response = requests.get(norma_link)
+                with timed("brocardi"):
+                    response = http_client.get(norma_link)
                 if response.status_code == 200:
-                    logging.info(f"Fetching information from: {norma_link}")
-                    html_content = response.text
-                    soup = BeautifulSoup(html_content, 'html.parser')
-                    info = {}
-                    position = soup.find('div', id='breadcrumb', recursive=True).text
-                    if position:
-                        position = position.strip().replace('\n', '').replace('  ', '')[17:]
-                    
-                    corpo = soup.find('div', class_='panes-condensed panes-w-ads content-ext-guide content-mark', recursive=True)
-                    if corpo:
-                        brocardi_sections = soup.find_all('div', class_='brocardi-content')
-                        if brocardi_sections:
-                            brocardi_texts = [broc.text.strip() for broc in brocardi_sections]
-                            info['Brocardi'] = brocardi_texts
-
-                        ratio_section = soup.find('div', class_='container-ratio')
-                        if ratio_section:
-                            ratio_text = ratio_section.find('div', class_='corpoDelTesto')
-                            if ratio_text:
-                                info['Ratio'] = ratio_text.text.strip()
-                        
-                        spiegazione_header = soup.find('h3', string=lambda text: 'Spiegazione dell\'art' in text)
-                        if spiegazione_header:
-                            spiegazione_content = spiegazione_header.find_next_sibling('div', class_='text')
-                            if spiegazione_content:
-                                info['Spiegazione'] = spiegazione_content.text.strip()
-                        
-                        massime_header = soup.find('h3', string=lambda text: 'Massime relative all\'art' in text)
-                        if massime_header:
-                            massime_content = massime_header.find_next_sibling('div', class_='text')
-                            if massime_content:
-                                info['Massime'] = massime_content.text.strip()
-                            
+                    logging.debug("Fetching information from: %s", norma_link)
+                    position, info = self.estrai_info(response.text)
                     return position, info, norma_link
             else:
                 logging.warning("No link found for the norma")
         return None, {}, None
 
+    @staticmethod
+    @timed("extract_brocardi")
+    def estrai_info(html_content):
+        """
+        Extracts the position and the Brocardi, Ratio, Spiegazione and Massime sections from an article page.
+        
+        Returns:
+        tuple -- (position, info dictionary)
+        """
+        doc = parse_html(html_content)
+        info = {}
+        position = get_text(find(doc, "//div[@id='breadcrumb']"))
+        if position:
+            position = position.strip().replace('\n', '').replace('  ', '')[17:]
+        
+        corpo = find(doc, "//div[" + " and ".join(has_class(c) for c in ('panes-condensed', 'panes-w-ads', 'content-ext-guide', 'content-mark')) + "]")
+        if corpo is not None:
+            brocardi_sections = doc.xpath(f"//div[{has_class('brocardi-content')}]")
+            if brocardi_sections:
+                brocardi_texts = [get_text(broc).strip() for broc in brocardi_sections]
+                info['Brocardi'] = brocardi_texts
+
+            ratio_text = find(doc, f"//div[{has_class('container-ratio')}]//div[{has_class('corpoDelTesto')}]")
+            if ratio_text is not None:
+                info['Ratio'] = get_text(ratio_text).strip()
+            
+            spiegazione_content = find(doc, f"//h3[contains(., \"Spiegazione dell'art\")]/following-sibling::div[{has_class('text')}][1]")
+            if spiegazione_content is not None:
+                info['Spiegazione'] = get_text(spiegazione_content).strip()
+            
+            massime_content = find(doc, f"//h3[contains(., \"Massime relative all'art\")]/following-sibling::div[{has_class('text')}][1]")
+            if massime_content is not None:
+                info['Massime'] = get_text(massime_content).strip()
+
+        return position, info
+
     def search_brocardi(self, search_term):
         """
         Search for a given term in the brocardi links and return the URL if available.
         """
         url = self.links.get(search_term)
         if url:
-            logging.info(f"Link found for term '{search_term}': {url}")
+            logging.debug("Link found for term '%s': %s", search_term, url)
         else:
-            logging.warning(f"No link found for term '{search_term}'")
+            logging.warning("No link found for term '%s'", search_term)
         return url if url else "No brocardi link available for this term."
@@ -1 +1,69 @@
-MAX_CACHE_SIZE = 1000
\ No newline at end of file
+import os
+
+MAX_CACHE_SIZE = 1000
+
+# HTTP client
+HTTP_TIMEOUT = (5, 30)  # (connect, read) seconds
+HTTP_POOL_CONNECTIONS = 10  # number of per-host pools kept alive
+HTTP_POOL_MAXSIZE = 20  # keep-alive connections per host
+HTTP_POOL_BLOCK = True  # wait for a free connection instead of opening extra ones
+HTTP_USER_AGENT = "VisuaLex/1.0"
+# Redirects upstream hosts, e.g. to a local stand-in for load tests:
+# VISUALEX_UPSTREAM_OVERRIDES="https://www.normattiva.it=http://127.0.0.1:8081,https://www.brocardi.it=http://127.0.0.1:8081"
+UPSTREAM_OVERRIDES = dict(
+    pair.split("=", 1) for pair in os.environ.get("VISUALEX_UPSTREAM_OVERRIDES", "").split(",") if "=" in pair)
+
+# Persistent document cache
+DOC_CACHE_ENABLED = os.environ.get("VISUALEX_DOC_CACHE_ENABLED", "1") != "0"
+DOC_CACHE_PATH = os.environ.get("VISUALEX_DOC_CACHE_PATH", os.path.join("cache", "documents.sqlite3"))
+DOC_CACHE_MAX_BYTES = int(os.environ.get("VISUALEX_DOC_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+DOC_CACHE_VIGENTE_TTL = int(os.environ.get("VISUALEX_DOC_CACHE_VIGENTE_TTL", 7 * 24 * 3600))  # seconds
+DOC_CACHE_MAX_STALE = int(os.environ.get("VISUALEX_DOC_CACHE_MAX_STALE", 30 * 24 * 3600))  # oldest copy served while revalidating
+DOC_REFRESH_WORKERS = 2  # background refreshes of stale documents
+
+# Act date registry (used by complete_date before falling back to Selenium)
+DATE_REGISTRY_PATH = os.environ.get("VISUALEX_DATE_REGISTRY_PATH", os.path.join("cache", "act_dates.sqlite3"))
+
+# Full-text index of the extracted articles
+SEARCH_INDEX_ENABLED = os.environ.get("VISUALEX_SEARCH_INDEX_ENABLED", "1") != "0"
+SEARCH_INDEX_PATH = os.environ.get("VISUALEX_SEARCH_INDEX_PATH", os.path.join("cache", "search.sqlite3"))
+SEARCH_MAX_RESULTS = 100
+
+# Headless browser pool
+DRIVER_POOL_SIZE = int(os.environ.get("VISUALEX_DRIVER_POOL_SIZE", 2))
+DRIVER_MAX_USES = 50  # recycle a browser after this many checkouts
+DRIVER_IDLE_TIMEOUT = 300  # seconds before an idle browser is closed
+DRIVER_CHECKOUT_TIMEOUT = 60  # seconds to wait for a free browser
+
+# Batch scraping
+BATCH_MAX_ITEMS = 500
+BATCH_MAX_WORKERS = int(os.environ.get("VISUALEX_BATCH_MAX_WORKERS", 8))
+STREAM_WINDOW = 32  # articles in flight while streaming
+
+# Whole-act mirror
+MIRROR_DIR = os.environ.get("VISUALEX_MIRROR_DIR", "mirror")
+MIRROR_RATE = 5.0  # articles per second
+
+# Async scraping core
+ASYNC_MAX_CONCURRENCY = int(os.environ.get("VISUALEX_ASYNC_MAX_CONCURRENCY", 256))  # upstream fetches in flight per event loop
+ASYNC_MAX_CONNECTIONS_PER_HOST = 128
+
+# Per-host upstream throttling (shared by every scraper, sync and async)
+HOST_RATE = float(os.environ.get("VISUALEX_HOST_RATE", 10.0))  # initial requests per second per host
+HOST_MIN_RATE = 0.5
+HOST_MAX_RATE = float(os.environ.get("VISUALEX_HOST_MAX_RATE", 50.0))
+HOST_CONCURRENCY = 4  # initial requests in flight per host
+HOST_MAX_CONCURRENCY = ASYNC_MAX_CONNECTIONS_PER_HOST
+HOST_LATENCY_TOLERANCE = 2.0  # back off when latency exceeds this multiple of the best observed latency
+
+# Retries and circuit breaker for upstream fetches
+HTTP_RETRIES = int(os.environ.get("VISUALEX_HTTP_RETRIES", 3))  # extra attempts after a transient failure
+HTTP_BACKOFF_BASE = 0.5  # seconds, doubled at every attempt (with full jitter)
+HTTP_BACKOFF_MAX = 8.0
+BREAKER_FAILURE_THRESHOLD = 5  # consecutive failures that open the circuit of a host
+BREAKER_RESET_TIMEOUT = 30  # seconds before a trial request is let through
+
+# Logging
+LOG_LEVEL = os.environ.get("VISUALEX_LOG_LEVEL", "INFO").upper()
+LOG_FILE = os.environ.get("VISUALEX_LOG_FILE", "norma.log")  # empty to log to stderr only
+LOG_DEBUG_SAMPLE_RATE = float(os.environ.get("VISUALEX_LOG_DEBUG_SAMPLE_RATE", 0.1))  # share of per-call DEBUG records kept
@@ -0,0 +1,137 @@
+import os
+import csv
+import json
+import time
+import sqlite3
+import threading
+import logging
+from .config import DATE_REGISTRY_PATH
+from .text_op import parse_date, normalize_act_type
+
+class DateRegistry:
+    """
+    Local registry mapping (act type, year, number) to the full date of the act.
+
+    It is filled by successful Normattiva lookups and by bulk imports, and is
+    consulted by complete_date before a browser is started.
+    """
+    def __init__(self, path=DATE_REGISTRY_PATH):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS act_dates (
+                    act_type TEXT NOT NULL,
+                    year TEXT NOT NULL,
+                    number TEXT NOT NULL,
+                    full_date TEXT NOT NULL,
+                    source TEXT,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (act_type, year, number)
+                )""")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def act_type_key(act_type):
+        """
+        Normalizes an act type to the key used in the registry, so that every
+        alias ('d.lgs.', 'decreto legislativo', 'decreto.legislativo') and the
+        form looked up by complete_date give the same key.
+        """
+        return normalize_act_type(normalize_act_type(str(act_type)), search=True).replace(" ", ".")
+
+    @classmethod
+    def _key(cls, act_type, year, number):
+        return cls.act_type_key(act_type), str(year).strip(), str(number).strip()
+
+    def lookup(self, act_type, year, number):
+        """
+        Returns the full date of an act.
+
+        Arguments:
+        act_type -- Type of the legal act
+        year -- Year of the act
+        number -- Number of the act
+
+        Returns:
+        str -- The date in YYYY-MM-DD format, or None if unknown
+        """
+        row = self._connect().execute(
+            "SELECT full_date FROM act_dates WHERE act_type = ? AND year = ? AND number = ?",
+            self._key(act_type, year, number)).fetchone()
+        return row[0] if row else None
+
+    def record(self, act_type, year, number, full_date, source=None):
+        """
+        Stores the full date of an act.
+
+        Arguments:
+        act_type -- Type of the legal act
+        year -- Year of the act
+        number -- Number of the act
+        full_date -- Full date, in extended Italian format or YYYY-MM-DD
+        source -- Where the date comes from (optional)
+        """
+        formatted_date = parse_date(full_date)
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO act_dates (act_type, year, number, full_date, source, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                self._key(act_type, year, number) + (formatted_date, source, time.time()))
+        logging.info("Recorded date %s for %s %s/%s", formatted_date, act_type, number, year)
+
+    def import_file(self, path):
+        """
+        Imports act dates from a CSV or JSON file.
+
+        CSV files need the columns act_type, number and date (year is optional
+        and derived from the date). JSON files hold a list of objects with the
+        same keys.
+
+        Arguments:
+        path -- Path to the file to import
+
+        Returns:
+        int -- Number of imported entries
+        """
+        with open(path, encoding="utf-8", newline="") as f:
+            if path.lower().endswith(".json"):
+                rows = json.load(f)
+            else:
+                rows = list(csv.DictReader(f))
+
+        count = 0
+        for row in rows:
+            try:
+                formatted_date = parse_date(row["date"])
+                year = row.get("year") or formatted_date[:4]
+                self.record(row["act_type"], year, row["number"], formatted_date, source=os.path.basename(path))
+                count += 1
+            except (KeyError, TypeError, ValueError) as e:
+                logging.warning("Skipping invalid registry row %s: %s", row, e)
+        logging.info("Imported %s act dates from %s", count, path)
+        return count
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_date_registry():
+    """
+    Returns the process-wide act date registry, creating it on first use.
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = DateRegistry()
+    return _registry
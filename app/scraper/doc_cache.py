@@ -0,0 +1,340 @@
+import os
+import re
+import time
+import zlib
+import sqlite3
+import threading
+import logging
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from .config import (DOC_CACHE_ENABLED, DOC_CACHE_PATH, DOC_CACHE_MAX_BYTES, DOC_CACHE_VIGENTE_TTL,
+                     DOC_CACHE_MAX_STALE, DOC_REFRESH_WORKERS)
+from . import http_client
+from .metrics import timed, DOCUMENT_CACHE
+from .singleflight import SingleFlight
+
+# A cached document with the validators needed to revalidate it
+CachedDocument = namedtuple("CachedDocument", ["html", "fetched_at", "etag", "last_modified"])
+
+IMMUTABLE_URN = re.compile(r"(@originale|!vig=\d{4}-\d{2}-\d{2})$")
+
+# Markup found in every Normattiva document: the article body or the act tree
+DOCUMENT_MARKUP = re.compile(r"""\bbodyTesto\b|\bid\s*=\s*["']?albero\b""")
+
+def is_immutable(urn):
+    """
+    Checks whether a URN points to a fixed version of the text.
+
+    Arguments:
+    urn -- The URN string
+
+    Returns:
+    bool -- True for '@originale' and '!vig=<date>' URNs, False for the current (vigente) text
+    """
+    return bool(IMMUTABLE_URN.search(urn))
+
+def is_document(html):
+    """
+    Checks whether a page is a Normattiva document, and not e.g. a
+    maintenance page served with status 200.
+
+    Arguments:
+    html -- The HTML of the page
+
+    Returns:
+    bool -- True if the page has an article body or an act tree
+    """
+    return bool(DOCUMENT_MARKUP.search(html))
+
+class DocumentCache:
+    """
+    Persistent store of downloaded documents, keyed by URN.
+
+    Documents are kept zlib-compressed in a SQLite database so that they
+    survive restarts and are shared by all the worker processes that point
+    to the same file. Current ("vigente") texts expire after `vigente_ttl`
+    seconds, while fixed versions never expire. Expired documents are kept
+    with their ETag and Last-Modified validators, so that they can be
+    refreshed with a conditional request. When the total size exceeds
+    `max_bytes`, the least recently used documents are evicted.
+    """
+    def __init__(self, path=DOC_CACHE_PATH, max_bytes=DOC_CACHE_MAX_BYTES, vigente_ttl=DOC_CACHE_VIGENTE_TTL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.vigente_ttl = vigente_ttl
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    urn TEXT PRIMARY KEY,
+                    body BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT
+                )""")
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(documents)")}
+            for column in ("etag", "last_modified"):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE documents ADD COLUMN {column} TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS documents_accessed_at ON documents (accessed_at)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def is_fresh(self, urn, fetched_at):
+        """
+        Checks whether a document fetched at `fetched_at` can still be served.
+        """
+        return is_immutable(urn) or time.time() - fetched_at < self.vigente_ttl
+
+    def get(self, urn):
+        """
+        Returns the cached document for a URN.
+
+        Arguments:
+        urn -- The URN of the document
+
+        Returns:
+        str -- The HTML of the document, or None if missing or expired
+        """
+        entry = self.lookup(urn)
+        if entry is None or not self.is_fresh(urn, entry.fetched_at):
+            return None
+        return entry.html
+
+    def lookup(self, urn):
+        """
+        Returns the cached document for a URN, even if expired.
+
+        Arguments:
+        urn -- The URN of the document
+
+        Returns:
+        CachedDocument -- The document and its validators, or None if missing
+        """
+        conn = self._connect()
+        row = conn.execute("SELECT body, fetched_at, etag, last_modified FROM documents WHERE urn = ?", (urn,)).fetchone()
+        if row is None:
+            logging.debug("Document cache miss: %s", urn)
+            return None
+        body, fetched_at, etag, last_modified = row
+        with conn:
+            conn.execute("UPDATE documents SET accessed_at = ? WHERE urn = ?", (time.time(), urn))
+        if self.is_fresh(urn, fetched_at):
+            logging.debug("Document cache hit: %s", urn)
+        else:
+            logging.debug("Document cache expired: %s", urn)
+        return CachedDocument(zlib.decompress(body).decode("utf-8"), fetched_at, etag, last_modified)
+
+    def put(self, urn, html, etag=None, last_modified=None):
+        """
+        Stores a document and evicts old entries if the cache is over size.
+
+        Arguments:
+        urn -- The URN of the document
+        html -- The HTML of the document
+        etag -- The ETag header of the response, if any
+        last_modified -- The Last-Modified header of the response, if any
+        """
+        body = zlib.compress(html.encode("utf-8"))
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO documents (urn, body, size, fetched_at, accessed_at, etag, last_modified) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (urn, body, len(body), now, now, etag, last_modified))
+        self.evict()
+
+    def revalidated(self, urn):
+        """
+        Marks a document as fresh again after the upstream confirmed it is unchanged (304).
+        """
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute("UPDATE documents SET fetched_at = ?, accessed_at = ? WHERE urn = ?", (now, now, urn))
+
+    def evict(self):
+        """
+        Removes the least recently used documents until the cache fits in `max_bytes`.
+        """
+        conn = self._connect()
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM documents").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        with conn:
+            rows = conn.execute("SELECT urn, size FROM documents ORDER BY accessed_at").fetchall()
+            evicted = 0
+            for urn, size in rows:
+                if total <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM documents WHERE urn = ?", (urn,))
+                total -= size
+                evicted += 1
+        logging.info("Document cache evicted %s documents", evicted)
+
+    def clear(self):
+        """
+        Removes every document from the cache.
+        """
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM documents")
+
+_cache = None
+_cache_lock = threading.Lock()
+_inflight = SingleFlight()
+_refresher = None
+_refreshing = set()
+_refresh_lock = threading.Lock()
+
+def get_document_cache():
+    """
+    Returns the process-wide document cache, or None if it is disabled.
+    """
+    global _cache
+    if not DOC_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = DocumentCache()
+    return _cache
+
+def fetch_document(urn):
+    """
+    Returns the HTML of a document, from the persistent cache when available,
+    otherwise downloading it and storing it in the cache. An expired copy is
+    revalidated with a conditional request, so an unchanged page costs a 304
+    instead of a full download.
+
+    Arguments:
+    urn -- The URN of the document
+
+    Returns:
+    str -- The HTML of the document
+
+    Raises:
+    http_client.UpstreamError -- If the upstream cannot provide the page
+    """
+    cache = get_document_cache()
+    entry = None
+    if cache is not None:
+        entry = cache.lookup(urn)
+        if entry is not None and cache.is_fresh(urn, entry.fetched_at):
+            DOCUMENT_CACHE.labels("hit").inc()
+            return entry.html
+        DOCUMENT_CACHE.labels("miss" if entry is None else "expired").inc()
+
+    # Concurrent requests for the same URN share a single download
+    return _inflight.do(urn, _download, urn, cache, entry)
+
+def fetch_document_stale(urn):
+    """
+    Stale-while-revalidate version of fetch_document: an expired cached copy
+    (up to DOC_CACHE_MAX_STALE seconds old) is returned at once and refreshed
+    in the background.
+
+    Arguments:
+    urn -- The URN of the document
+
+    Returns:
+    tuple -- (HTML, fetch timestamp, 'hit' | 'stale' | 'miss')
+
+    Raises:
+    http_client.UpstreamError -- If the document is not cached and the upstream cannot provide it
+    """
+    cache = get_document_cache()
+    if cache is not None:
+        entry = cache.lookup(urn)
+        if entry is not None:
+            if cache.is_fresh(urn, entry.fetched_at):
+                DOCUMENT_CACHE.labels("hit").inc()
+                return entry.html, entry.fetched_at, "hit"
+            if time.time() - entry.fetched_at < DOC_CACHE_MAX_STALE:
+                DOCUMENT_CACHE.labels("stale").inc()
+                refresh_in_background(urn)
+                return entry.html, entry.fetched_at, "stale"
+    return fetch_document(urn), time.time(), "miss"
+
+def refresh_in_background(urn):
+    """
+    Schedules the revalidation of a cached document, unless one is already pending.
+    """
+    global _refresher
+    with _refresh_lock:
+        if urn in _refreshing:
+            return
+        _refreshing.add(urn)
+        if _refresher is None:
+            _refresher = ThreadPoolExecutor(max_workers=DOC_REFRESH_WORKERS, thread_name_prefix="doc-refresh")
+    _refresher.submit(_refresh, urn)
+
+def _refresh(urn):
+    try:
+        cache = get_document_cache()
+        _inflight.do(urn, _download, urn, cache, cache.lookup(urn))
+        logging.debug("Document refreshed in background: %s", urn)
+    except Exception as e:
+        logging.warning("Background refresh failed for %s: %s", urn, e)
+    finally:
+        with _refresh_lock:
+            _refreshing.discard(urn)
+
+def revalidation_headers(entry):
+    """
+    Builds the conditional request headers for an expired cached document.
+
+    Arguments:
+    entry -- The CachedDocument, or None
+
+    Returns:
+    dict -- If-None-Match / If-Modified-Since headers (empty without validators)
+    """
+    headers = {}
+    if entry is not None:
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+    return headers
+
+def _download(urn, cache, entry=None):
+    with timed("fetch"):
+        response = http_client.get(urn, headers=revalidation_headers(entry))
+    if response.status_code == 304 and entry is not None:
+        logging.debug("Document revalidated: %s", urn)
+        DOCUMENT_CACHE.labels("revalidated").inc()
+        cache.revalidated(urn)
+        return entry.html
+    if response.status_code != 200:
+        raise http_client.UpstreamError(f"Failed to retrieve the page, status code: {response.status_code}",
+                                        status=response.status_code, response=response)
+
+    html = response.text
+    if cache is not None:
+        store(cache, urn, html, response.headers)
+    return html
+
+def store(cache, urn, html, headers):
+    """
+    Stores a downloaded page in the cache, unless it is not a Normattiva
+    document: such a page would otherwise be served until it expires, or
+    forever for an immutable URN.
+    """
+    if not is_document(html):
+        logging.warning("Not caching %s: the page has no Normattiva markup", urn)
+        return
+    cache.put(urn, html, headers.get("ETag"), headers.get("Last-Modified"))
@@ -0,0 +1,192 @@
+import time
+import random
+import threading
+from urllib.parse import urlsplit
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+from .config import (HTTP_TIMEOUT, HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE,
+                     HTTP_POOL_BLOCK, HTTP_USER_AGENT, HTTP_RETRIES,
+                     HTTP_BACKOFF_BASE, HTTP_BACKOFF_MAX, UPSTREAM_OVERRIDES)
+from .ratelimit import get_host_limiter, retry_after_seconds
+from .breaker import get_breaker, HALF_OPEN
+from .metrics import UPSTREAM_RESPONSES, UPSTREAM_SECONDS
+
+try:
+    import brotli  # noqa: F401  (enables 'br' decoding in urllib3)
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+# Answers worth retrying: throttling and transient server errors
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+class UpstreamError(requests.HTTPError):
+    """
+    Raised when an upstream host cannot provide a document: non-200 answer,
+    network failure after all retries, or open circuit.
+    """
+    def __init__(self, message, status=None, response=None):
+        super().__init__(message, response=response)
+        self.status = status
+
+class CircuitOpenError(UpstreamError):
+    """
+    Raised without contacting the host while its circuit breaker is open.
+    """
+
+_session = None
+_session_lock = threading.Lock()
+
+def create_session(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE, pool_block=HTTP_POOL_BLOCK):
+    """
+    Crea una sessione HTTP con pool di connessioni keep-alive per host.
+    
+    Arguments:
+    pool_connections -- Number of per-host connection pools to keep
+    pool_maxsize -- Maximum number of connections kept alive per host
+    pool_block -- Whether to wait for a free connection when the pool is full
+    
+    Returns:
+    requests.Session -- The configured session
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "User-Agent": HTTP_USER_AGENT,
+        "Accept-Encoding": ACCEPT_ENCODING,
+        "Connection": "keep-alive",
+    })
+    logging.info("HTTP session created: pool_connections=%s, pool_maxsize=%s", pool_connections, pool_maxsize)
+    return session
+
+def get_session():
+    """
+    Returns the process-wide HTTP session, creating it on first use.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+    return _session
+
+def upstream_url(url):
+    """
+    Applies UPSTREAM_OVERRIDES to a URL (unchanged when no override matches).
+    """
+    for prefix, target in UPSTREAM_OVERRIDES.items():
+        if url.startswith(prefix):
+            return target + url[len(prefix):]
+    return url
+
+def backoff_delay(attempt):
+    """
+    Returns the wait before retry number `attempt` (0-based): exponential
+    backoff with full jitter, so that clients failing together do not retry together.
+    """
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * 2 ** attempt))
+
+def check_circuit(url):
+    """
+    Returns the circuit breaker of the host of `url`.
+    
+    Returns:
+    tuple -- (circuit breaker, whether the request is the half-open trial)
+    
+    Raises:
+    CircuitOpenError -- If the circuit is open
+    """
+    breaker = get_breaker(url)
+    mode = breaker.start()
+    if mode is None:
+        raise CircuitOpenError(f"Upstream {breaker.name} unavailable, retry in {breaker.retry_in():.0f}s")
+    return breaker, mode == HALF_OPEN
+
+def get(url, timeout=HTTP_TIMEOUT, retries=HTTP_RETRIES, **kwargs):
+    """
+    Esegue una GET sulla sessione condivisa, rispettando i limiti di
+    frequenza e di concorrenza dell'host.
+    
+    Network errors and 429/5xx answers are retried up to `retries` times
+    with jittered exponential backoff; repeated failures open the circuit
+    breaker of the host.
+    
+    Arguments:
+    url -- The URL to fetch
+    timeout -- (connect, read) timeout in seconds
+    retries -- Number of retries after a transient failure
+    
+    Returns:
+    requests.Response -- The HTTP response (possibly a 429/5xx once the retries are exhausted)
+    
+    Raises:
+    UpstreamError -- If the host cannot be reached or its circuit is open
+    """
+    for attempt in range(retries + 1):
+        breaker, trial = check_circuit(url)
+        try:
+            response = _send(url, timeout, **kwargs)
+        except requests.RequestException as e:
+            breaker.record_failure()
+            if attempt == retries:
+                raise UpstreamError(f"Failed to reach {url}: {e}") from e
+            logging.warning("Request to %s failed (%s), retrying", url, e)
+        else:
+            if response.status_code not in RETRY_STATUSES:
+                breaker.record_success()
+                return response
+            # Throttling alone does not open the circuit, but a throttled trial keeps it open
+            if response.status_code != 429 or trial:
+                breaker.record_failure()
+            if attempt == retries:
+                return response
+            logging.warning("Request to %s answered %s, retrying", url, response.status_code)
+        finally:
+            # Interrupted before an outcome: the trial must not leave the circuit half-open
+            if trial:
+                breaker.release_trial()
+        time.sleep(backoff_delay(attempt))
+
+def _send(url, timeout, **kwargs):
+    limiter = get_host_limiter(url)
+    limiter.acquire()
+    started = time.monotonic()
+    status = retry_after = None
+    cancelled = False
+    try:
+        response = get_session().get(upstream_url(url), timeout=timeout, **kwargs)
+        status = response.status_code
+        retry_after = retry_after_seconds(response.headers.get("Retry-After"))
+        return response
+    except requests.RequestException:
+        raise
+    except BaseException:
+        # Interrupted on our side: says nothing about the host
+        cancelled = True
+        raise
+    finally:
+        elapsed = time.monotonic() - started
+        limiter.release(elapsed, status, retry_after, cancelled=cancelled)
+        if not cancelled:
+            record_upstream(url, status, elapsed)
+
+def record_upstream(url, status, elapsed):
+    """
+    Counts an upstream answer by host and status ('error' when none arrived) and records its latency.
+    """
+    host = urlsplit(url).hostname or ''
+    UPSTREAM_RESPONSES.labels(host, str(status or 'error')).inc()
+    UPSTREAM_SECONDS.labels(host).observe(elapsed)
+
+def close():
+    """
+    Chiude la sessione condivisa e tutte le connessioni aperte.
+    """
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
@@ -0,0 +1,99 @@
+import json
+import queue
+import atexit
+import random
+import logging
+import logging.handlers
+import threading
+from .config import LOG_LEVEL, LOG_FILE, LOG_DEBUG_SAMPLE_RATE
+
+LOG_FORMAT = '%(asctime)s %(levelname)s %(message)s'
+
+# Logger of the one-record-per-request summaries
+request_logger = logging.getLogger("visualex.request")
+
+_listener = None
+_setup_lock = threading.Lock()
+
+class DebugSampler(logging.Filter):
+    """
+    Keeps only a random share of the DEBUG records; other levels always pass.
+    """
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+class Fields:
+    """
+    Wraps the fields of a structured record, serialized to JSON only when
+    the record is actually formatted.
+    """
+    def __init__(self, fields):
+        self.fields = fields
+
+    def __str__(self):
+        return json.dumps(self.fields, ensure_ascii=False, default=str)
+
+def setup_logging(level=LOG_LEVEL, path=LOG_FILE, debug_sample_rate=LOG_DEBUG_SAMPLE_RATE):
+    """
+    Configures the application logging, once per process.
+
+    The calling thread formats each record (QueueHandler.prepare) and puts
+    it on an in-memory queue; a background listener writes it to the log
+    file and to stderr, so request threads never wait on the file lock or
+    on disk I/O. Records below the configured level are dropped before
+    being formatted.
+
+    Arguments:
+    level -- Minimum level to log
+    path -- Log file ('' to log to stderr only)
+    debug_sample_rate -- Share of DEBUG records to keep
+    """
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return
+        formatter = logging.Formatter(LOG_FORMAT)
+        handlers = [logging.StreamHandler()]
+        if path:
+            handlers.append(logging.FileHandler(path, encoding='utf-8'))
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        queue_handler.addFilter(DebugSampler(debug_sample_rate))
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        root.setLevel(level)
+
+        _listener = logging.handlers.QueueListener(log_queue, *handlers)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+def shutdown_logging():
+    """
+    Flushes the queued records and stops the background listener.
+    """
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+def log_request(message, **fields):
+    """
+    Writes the single structured summary record of a request.
+
+    Arguments:
+    message -- Short description (e.g. 'POST /scrape')
+    fields -- Values to record (status, duration_ms, ...), serialized as JSON
+    """
+    if request_logger.isEnabledFor(logging.INFO):
+        request_logger.info("%s %s", message, Fields(fields))
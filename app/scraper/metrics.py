@@ -0,0 +1,179 @@
+import time
+import threading
+from functools import wraps
+
+# Default histogram buckets, in seconds: from a cached lookup to a slow browser session
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_metrics = []
+_cached_functions = {}
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+class _Timer:
+    # Context manager and decorator recording the elapsed time in a histogram
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started)
+
+    def __call__(self, fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.histogram.observe(time.perf_counter() - started)
+        return wrapper
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        with self.lock:
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[index] += 1
+                    break
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        return _Timer(self)
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.children = {}
+        self.lock = threading.Lock()
+        _metrics.append(self)
+
+    def labels(self, *values):
+        """
+        Returns the series for the given label values, creating it on first use.
+        """
+        child = self.children.get(values)
+        if child is None:
+            with self.lock:
+                child = self.children.get(values)
+                if child is None:
+                    child = self.children[values] = self._new_child()
+        return child
+
+    def collect(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        with self.lock:
+            children = sorted(self.children.items(), key=lambda item: tuple(map(str, item[0])))
+        for values, child in children:
+            yield from self._samples(values, child)
+
+class Counter(_Metric):
+    """
+    Monotonic counter, optionally split by labels.
+    """
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def _samples(self, values, child):
+        yield f"{self.name}{_format_labels(self.labelnames, values)} {child.value}"
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values (e.g. durations), optionally split by labels.
+    """
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def _samples(self, values, child):
+        with child.lock:
+            counts, total, count = list(child.counts), child.sum, child.count
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            yield f"{self.name}_bucket{_format_labels(self.labelnames, values, [('le', bound)])} {cumulative}"
+        yield f"{self.name}_bucket{_format_labels(self.labelnames, values, [('le', '+Inf')])} {count}"
+        yield f"{self.name}_sum{_format_labels(self.labelnames, values)} {total}"
+        yield f"{self.name}_count{_format_labels(self.labelnames, values)} {count}"
+
+STAGE_SECONDS = Histogram("visualex_stage_seconds", "Time spent in each scraping stage.", ["stage"])
+UPSTREAM_RESPONSES = Counter("visualex_upstream_responses_total", "Upstream answers by host and status code.", ["host", "status"])
+UPSTREAM_SECONDS = Histogram("visualex_upstream_request_seconds", "Latency of single upstream requests.", ["host"])
+DOCUMENT_CACHE = Counter("visualex_document_cache_total", "Document cache lookups by result.", ["result"])
+REQUEST_SECONDS = Histogram("visualex_request_seconds", "API request latency.", ["method", "path", "status"])
+
+def timed(stage):
+    """
+    Times a scraping stage, as a context manager or as a decorator.
+
+    Arguments:
+    stage -- Name of the stage (e.g. 'generate_urn', 'fetch', 'parse')
+    """
+    return STAGE_SECONDS.labels(stage).time()
+
+def register_cache(fn):
+    """
+    Decorator exposing the hit/miss counters of an lru_cache'd function;
+    goes above @lru_cache.
+    """
+    _cached_functions[f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"] = fn
+    return fn
+
+def _collect_caches():
+    yield "# HELP visualex_cache_requests_total Calls of the memoized functions by result."
+    yield "# TYPE visualex_cache_requests_total counter"
+    for name, fn in sorted(_cached_functions.items()):
+        info = fn.cache_info()
+        yield f'visualex_cache_requests_total{{cache="{name}",result="hit"}} {info.hits}'
+        yield f'visualex_cache_requests_total{{cache="{name}",result="miss"}} {info.misses}'
+    yield "# HELP visualex_cache_entries Entries currently held by the memoized functions."
+    yield "# TYPE visualex_cache_entries gauge"
+    for name, fn in sorted(_cached_functions.items()):
+        yield f'visualex_cache_entries{{cache="{name}"}} {fn.cache_info().currsize}'
+
+def render():
+    """
+    Returns all the metrics in the Prometheus text exposition format.
+    """
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.collect())
+    lines.extend(_collect_caches())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,124 @@
+import os
+import re
+import json
+import logging
+from .config import MIRROR_DIR, MIRROR_RATE, BATCH_MAX_WORKERS
+from .batch import act_items, act_from_request, iter_batch, scrape_item, norma_visitata_from_request
+from .ratelimit import RateLimiter
+from .search_index import get_search_index
+
+MANIFEST = "manifest.json"
+
+def act_slug(data):
+    """
+    Builds a directory name for an act from its URN.
+
+    Arguments:
+    data -- Dictionary with tipo_atto and optionally data, numero_atto, versione and data_versione
+
+    Returns:
+    str -- A filesystem-safe name
+
+    Raises:
+    ValueError -- If the URN of the act cannot be generated (e.g. its date cannot be completed)
+    """
+    urn = act_from_request(data).get_urn().split('urn:nir:')[-1]
+    return re.sub(r'[^\w.-]+', '_', urn).strip('_')
+
+def article_filename(articolo):
+    return "art_" + re.sub(r'[^\w.-]+', '_', articolo) + ".json"
+
+def _write_json(path, content):
+    # Write to a temporary file first, so an interrupted run never leaves a truncated file
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(content, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def mirror_act(data, dest=None, max_workers=BATCH_MAX_WORKERS, rate=MIRROR_RATE):
+    """
+    Scarica tutti gli articoli di un atto in una copia locale.
+
+    Every article is saved as a JSON file as soon as it is extracted, and the
+    act tree and article list are kept in a manifest, so an interrupted run
+    restarts from the articles still missing.
+
+    Arguments:
+    data -- Dictionary with tipo_atto and optionally data, numero_atto, versione and data_versione
+    dest -- Destination directory (default: MIRROR_DIR/<act>)
+    max_workers -- Maximum number of concurrent upstream fetches
+    rate -- Maximum number of articles fetched per second
+
+    Yields:
+    dict -- Progress events: 'start', one 'article' per fetched article, 'done'
+
+    Raises:
+    ValueError -- If the act cannot be identified
+    http_client.UpstreamError -- If the tree of the act cannot be fetched
+    """
+    dest = dest or os.path.join(MIRROR_DIR, act_slug(data))
+    os.makedirs(dest, exist_ok=True)
+    manifest_path = os.path.join(dest, MANIFEST)
+
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        items = manifest['items']
+        logging.info("Resuming mirror in %s", dest)
+    else:
+        tree, items = act_items(data)
+        manifest = {'act': data, 'tree': tree, 'items': items}
+        _write_json(manifest_path, manifest)
+
+    todo = [item for item in items
+            if not os.path.exists(os.path.join(dest, article_filename(item['numero_articolo'])))]
+    logging.info("Mirroring %s of %s articles into %s", len(todo), len(items), dest)
+    yield {'event': 'start', 'dest': dest, 'total': len(items), 'todo': len(todo)}
+
+    limiter = RateLimiter(rate)
+
+    def scrape(item):
+        limiter.acquire()
+        return scrape_item(item)
+
+    errors = 0
+    for index, result in iter_batch(todo, max_workers=max_workers, scrape=scrape):
+        articolo = todo[index]['numero_articolo']
+        if 'error' in result:
+            errors += 1
+            logging.warning("Mirror failed for article %s: %s", articolo, result['error'])
+        else:
+            _write_json(os.path.join(dest, article_filename(articolo)), result)
+        yield {'event': 'article', 'numero_articolo': articolo, 'error': result.get('error')}
+
+    yield {'event': 'done', 'dest': dest, 'total': len(items), 'fetched': len(todo) - errors, 'errors': errors}
+
+def index_mirror(dest):
+    """
+    Adds the articles of a local mirror to the search index.
+
+    New mirrors are indexed while they are downloaded; this covers the ones
+    made before, or with the index disabled.
+
+    Arguments:
+    dest -- The mirror directory
+
+    Returns:
+    int -- Number of articles added or updated
+    """
+    index = get_search_index()
+    if index is None:
+        raise RuntimeError("Indice di ricerca disabilitato")
+    with open(os.path.join(dest, MANIFEST), encoding='utf-8') as f:
+        manifest = json.load(f)
+    count = 0
+    for item in manifest['items']:
+        path = os.path.join(dest, article_filename(item['numero_articolo']))
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding='utf-8') as f:
+            article = json.load(f)
+        if article.get('html') and index.add(norma_visitata_from_request(item).get_urn(), article['html']):
+            count += 1
+    logging.info("Indexed %s articles from %s", count, dest)
+    return count
@@ -1,15 +1,10 @@
 from .urngenerator import generate_urn
 from .text_op import normalize_act_type
 from datetime import datetime
-from .treextractor import get_tree
+from .treextractor import fetch_tree
+from .http_client import UpstreamError
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO,
-                    format='%(asctime)s %(levelname)s %(message)s',
-                    handlers=[logging.FileHandler("norma.log"),
-                              logging.StreamHandler()])
-
 class Norma:
     def __init__(self, tipo_atto, data=None, numero_atto=None, url=None):
         """
@@ -22,7 +17,7 @@ class Norma:
         url -- URL of the act
         tree -- Tree structure of the act
         """
-        logging.info(f"Initializing Norma with tipo_atto: {tipo_atto}, data: {data}, numero_atto: {numero_atto}, url: {url}")
+        logging.debug("Initializing Norma with tipo_atto: %s, data: %s, numero_atto: %s, url: %s", tipo_atto, data, numero_atto, url)
         
         self.tipo_atto_str = normalize_act_type(tipo_atto, search=True)
         self.tipo_atto_urn = normalize_act_type(tipo_atto)
@@ -31,7 +26,7 @@ class Norma:
         self.url = url or generate_urn(act_type=self.tipo_atto_urn, date=data, act_number=numero_atto, urn_flag=False)
         
         
-        logging.info(f"Norma initialized: {self}")
+        logging.debug("Norma initialized: %s", self)
 
     def __str__(self):
         """
@@ -60,7 +55,6 @@ class Norma:
             'data': self.data,
             'numero_atto': self.numero_atto,
             'url': self.url,
-            'tree': self.tree,
         }
 
 class NormaVisitata(Norma):
@@ -74,6 +68,7 @@ class NormaVisitata(Norma):
         versione -- Version of the act
         data_versione -- Date of the version
         urn -- URN of the act
+        tree -- Tree structure of the act (fetched lazily if not given)
         timestamp -- Timestamp of the visit
         """
         # Initialize additional attributes first
@@ -81,13 +76,30 @@ class NormaVisitata(Norma):
         self.versione = versione
         self.data_versione = data_versione
         self.urn = urn or generate_urn(norma.tipo_atto_urn, date=norma.data, act_number=norma.numero_atto, article=numero_articolo, version=versione, version_date=data_versione)
-        self.tree = tree if tree else get_tree(self.urn)
+        self._tree = tree
         self.timestamp = timestamp if timestamp else datetime.now().isoformat()
 
         # Call the base class initializer
         super().__init__(tipo_atto=norma.tipo_atto_str, data=norma.data, numero_atto=norma.numero_atto, url=norma.url)
 
-        logging.info(f"NormaVisitata initialized: {self}")
+        logging.debug("NormaVisitata initialized: %s", self)
+
+    @property
+    def tree(self):
+        """
+        Tree structure of the act, fetched from the URN on first access.
+        """
+        if not self._tree:
+            try:
+                self._tree = fetch_tree(self.urn)
+            except UpstreamError as e:
+                # Not stored, so that the next access tries again
+                return str(e)
+        return self._tree
+
+    @tree.setter
+    def tree(self, value):
+        self._tree = value
 
     def __str__(self):
         """
@@ -98,14 +110,19 @@ class NormaVisitata(Norma):
             base_str += f" art. {self.numero_articolo}"
         return base_str
     
-    def to_dict(self):
+    def to_dict(self, include_tree=True):
         """
         Converts the NormaVisitata object to a dictionary.
         
+        Arguments:
+        include_tree -- Whether to include the tree (fetching it if needed)
+        
         Returns:
         dict -- Dictionary representation of the NormaVisitata object
         """
         base_dict = super().to_dict()
+        if include_tree:
+            base_dict['tree'] = self.tree
         base_dict.update({
             'numero_articolo': self.numero_articolo,
             'versione': self.versione,
@@ -121,7 +138,7 @@ class NormaVisitata(Norma):
         Returns:
         str -- URN of the NormaVisitata object
         """
-        logging.info(f"Getting URN: {self.urn}")
+        logging.debug("Getting URN: %s", self.urn)
         return self.urn
     
     def get_url(self):
@@ -144,7 +161,7 @@ class NormaVisitata(Norma):
         Returns:
         NormaVisitata -- The created NormaVisitata object
         """
-        logging.info(f"Creating NormaVisitata from dict: {data}")
+        logging.debug("Creating NormaVisitata from dict: %s", data)
         
         norma = Norma(
             tipo_atto=data['tipo_atto'],
@@ -161,5 +178,5 @@ class NormaVisitata(Norma):
             timestamp=data.get('timestamp')
         )
         
-        logging.info(f"NormaVisitata created: {norma_visitata}")
+        logging.debug("NormaVisitata created: %s", norma_visitata)
         return norma_visitata
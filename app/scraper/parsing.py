@@ -0,0 +1,64 @@
+import lxml.html
+from .metrics import timed
+from .http_client import UpstreamError
+
+class MarkupError(UpstreamError):
+    """
+    Raised when a page lacks the expected markup, e.g. a maintenance page
+    served with status 200.
+    """
+
+@timed("parse")
+def parse_html(html):
+    """
+    Parses an HTML document with lxml.
+    
+    Arguments:
+    html -- The HTML content, as str or bytes
+    
+    Returns:
+    lxml.html.HtmlElement -- The root element of the document
+    """
+    if isinstance(html, str) and html.lstrip().startswith('<?xml'):
+        # lxml refuses str input carrying an XML encoding declaration
+        html = html.encode('utf-8')
+    return lxml.html.fromstring(html)
+
+def has_class(cls):
+    """
+    XPath predicate matching elements whose class attribute contains `cls`.
+    """
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')"
+
+def find(node, xpath):
+    """
+    Returns the first element matching `xpath`, or None.
+    """
+    result = node.xpath(xpath)
+    return result[0] if result else None
+
+# Elements whose content is not text, left out by BeautifulSoup's get_text
+NON_TEXT_TAGS = ("script", "style", "template")
+
+def _strings(node):
+    if node.text:
+        yield node.text
+    for child in node:
+        # Comments and processing instructions have a non-string tag
+        if isinstance(child.tag, str) and child.tag not in NON_TEXT_TAGS:
+            yield from _strings(child)
+        if child.tail:
+            yield child.tail
+
+def get_text(node, separator="", strip=False):
+    """
+    Returns the text of an element, like BeautifulSoup's get_text: comments
+    and the content of script, style and template elements are left out.
+    """
+    if next(node.iter(*NON_TEXT_TAGS), None) is None:
+        strings = node.itertext()
+    else:
+        strings = _strings(node)
+    if strip:
+        return separator.join(t.strip() for t in strings if t.strip())
+    return separator.join(strings)
@@ -5,38 +5,45 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from functools import lru_cache
+from .metrics import register_cache
 from .config import MAX_CACHE_SIZE
+from .sys_op import get_driver_pool
 
-# Configure logging
-logging.basicConfig(level=logging.INFO,
-                    format='%(asctime)s %(levelname)s %(message)s',
-                    handlers=[logging.FileHandler("norma.log"),
-                              logging.StreamHandler()])
 
+@register_cache
 @lru_cache(maxsize=MAX_CACHE_SIZE)
 def extract_pdf(driver, urn, timeout=30):
     """
     Extracts a PDF from a given URN using Selenium WebDriver.
     
+    The driver is left open so that it can be reused; when no driver is given,
+    one is checked out from the shared browser pool and returned to it.
+    
     Arguments:
-    driver -- Selenium WebDriver instance
+    driver -- Selenium WebDriver instance, or None to use the browser pool
     urn -- URN of the legal document
     timeout -- Maximum time to wait for operations (default: 30 seconds)
     
     Returns:
     str -- Path to the downloaded PDF file
     """
-    logging.info(f"Extracting PDF for URN: {urn} with timeout: {timeout}")
+    logging.debug("Extracting PDF for URN: %s with timeout: %s", urn, timeout)
     
+    if driver is None:
+        with get_driver_pool().driver() as pooled_driver:
+            return _download_pdf(pooled_driver, urn, timeout)
+    return _download_pdf(driver, urn, timeout)
+
+def _download_pdf(driver, urn, timeout):
     download_dir = os.path.join(os.getcwd(), "download")
     
     if not os.path.exists(download_dir):
         os.makedirs(download_dir)
-        logging.info(f"Created download directory: {download_dir}")
+        logging.debug("Created download directory: %s", download_dir)
     
     try:
         driver.get(urn)
-        logging.info(f"Accessed URN: {urn}")
+        logging.debug("Accessed URN: %s", urn)
         
         # Selectors for the export button and the PDF download button
         export_button_selector = "#mySidebarRight > div > div:nth-child(2) > div > div > ul > li:nth-child(2) > a"
@@ -44,15 +51,15 @@ def extract_pdf(driver, urn, timeout=30):
         
         # Click the export button
         WebDriverWait(driver, timeout).until(EC.element_to_be_clickable((By.CSS_SELECTOR, export_button_selector))).click()
-        logging.info("Clicked on export button")
+        logging.debug("Clicked on export button")
         
         # Switch to the new window that opens
         driver.switch_to.window(driver.window_handles[-1])
-        logging.info("Switched to the export window")
+        logging.debug("Switched to the export window")
         
         # Click the download PDF button
         WebDriverWait(driver, timeout).until(EC.element_to_be_clickable((By.NAME, export_pdf_selector))).click()
-        logging.info("Clicked on download PDF button")
+        logging.debug("Clicked on download PDF button")
         
         # Wait for the download to complete
         start_time = time.time()
@@ -64,14 +71,11 @@ def extract_pdf(driver, urn, timeout=30):
             if new_files:
                 pdf_file_path = os.path.join(download_dir, new_files.pop())
                 if pdf_file_path.endswith(".pdf"):
-                    logging.info(f"PDF downloaded successfully: {pdf_file_path}")
+                    logging.debug("PDF downloaded successfully: %s", pdf_file_path)
                     return pdf_file_path
             if time.time() - start_time > timeout:
                 raise TimeoutError("Download PDF timed out")
             time.sleep(1)
     except Exception as e:
-        logging.error(f"Error extracting PDF: {e}", exc_info=True)
+        logging.error("Error extracting PDF: %s", e, exc_info=True)
         raise
-    finally:
-        logging.info("Closing the driver")
-        driver.quit()
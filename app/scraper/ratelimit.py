@@ -0,0 +1,183 @@
+import time
+import logging
+import threading
+from urllib.parse import urlsplit
+from .config import (HOST_RATE, HOST_MIN_RATE, HOST_MAX_RATE, HOST_CONCURRENCY, HOST_MAX_CONCURRENCY,
+                     HOST_LATENCY_TOLERANCE)
+
+class RateLimiter:
+    """
+    Thread-safe token bucket: allows `rate` operations per second on average,
+    with bursts of up to `burst` operations.
+    """
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens=1):
+        """
+        Takes `tokens` tokens if they are available, without waiting.
+
+        Returns:
+        bool -- True if the tokens were taken
+        """
+        with self.lock:
+            self._refill()
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1):
+        """
+        Takes `tokens` tokens, waiting until they are available.
+        """
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+class AdaptiveLimiter:
+    """
+    Throttles the requests sent to one upstream host.
+
+    Requests are paced by a token bucket and the number of requests in flight
+    is capped by a concurrency limit. Both adapt to the answers of the host
+    (additive increase, multiplicative decrease): every successful request
+    raises them, quickly until the first back-off and slowly afterwards,
+    while a 429 or 5xx halves them and latency well above the best observed
+    one shrinks the concurrency limit.
+    """
+    def __init__(self, rate=HOST_RATE, concurrency=HOST_CONCURRENCY, min_rate=HOST_MIN_RATE, max_rate=HOST_MAX_RATE,
+                 max_concurrency=HOST_MAX_CONCURRENCY, latency_tolerance=HOST_LATENCY_TOLERANCE):
+        self.rate = float(rate)
+        self.concurrency = float(concurrency)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.max_concurrency = max_concurrency
+        self.latency_tolerance = latency_tolerance
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.in_flight = 0
+        self.latency = None  # moving average
+        self.best_latency = None
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+        self.slow_start = True
+        self.cond = threading.Condition()
+
+    def _reserve(self):
+        # Caller holds the lock. Returns 0 when a slot was taken, else the seconds to wait.
+        now = time.monotonic()
+        self.tokens = min(max(1.0, self.rate), self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.in_flight >= int(self.concurrency):
+            return 0.05
+        if self.tokens < 1:
+            return (1 - self.tokens) / self.rate
+        self.tokens -= 1
+        self.in_flight += 1
+        return 0
+
+    def try_acquire(self):
+        """
+        Takes a slot if one is available, without waiting.
+
+        Returns:
+        float -- 0 if the slot was taken, otherwise the seconds to wait before retrying
+        """
+        with self.cond:
+            return self._reserve()
+
+    def acquire(self):
+        """
+        Takes a slot, waiting until the rate and concurrency limits allow it.
+        """
+        with self.cond:
+            while True:
+                wait = self._reserve()
+                if not wait:
+                    return
+                self.cond.wait(wait)
+
+    def release(self, latency, status=None, retry_after=None, cancelled=False):
+        """
+        Frees a slot and adapts the limits to the outcome of the request.
+
+        Arguments:
+        latency -- Seconds taken by the request
+        status -- HTTP status code, or None if the request failed without an answer
+        retry_after -- Seconds the host asked to wait (Retry-After header), if any
+        cancelled -- Whether the request was cancelled on our side (the limits are left as they are)
+        """
+        with self.cond:
+            self.in_flight -= 1
+            # Waiters only wake up once the lock is released, so they see the new limits
+            self.cond.notify_all()
+            if cancelled:
+                return
+            now = time.monotonic()
+            if status is None or status == 429 or status >= 500:
+                if retry_after:
+                    self.blocked_until = max(self.blocked_until, now + retry_after)
+                self._decrease(now, 0.5, rate=True)
+            else:
+                self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+                self.best_latency = self.latency if self.best_latency is None else min(self.best_latency, self.latency)
+                if self.latency > self.latency_tolerance * self.best_latency:
+                    self._decrease(now, 0.9, rate=False)
+                else:
+                    # Until the first back-off grow by one per success (slow start), then by one per round
+                    step = 1 if self.slow_start else 1 / self.concurrency
+                    self.concurrency = min(self.max_concurrency, self.concurrency + step)
+                    step = 1 if self.slow_start else 1 / self.rate
+                    self.rate = min(self.max_rate, self.rate + step)
+
+    def _decrease(self, now, factor, rate):
+        # Back off at most once per round trip, so a burst of failures from
+        # requests sent together counts as one signal
+        if now - self.last_decrease < max(self.latency or 0, 1.0):
+            return
+        self.last_decrease = now
+        self.slow_start = False
+        self.concurrency = max(1.0, self.concurrency * factor)
+        if rate:
+            self.rate = max(self.min_rate, self.rate * factor)
+        logging.info("Throttling upstream: rate=%.1f/s, concurrency=%s", self.rate, int(self.concurrency))
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_host_limiter(url):
+    """
+    Returns the limiter shared by all the requests to the host of `url`.
+    """
+    host = urlsplit(url).hostname or ''
+    limiter = _limiters.get(host)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.setdefault(host, AdaptiveLimiter())
+    return limiter
+
+def retry_after_seconds(value):
+    """
+    Parses a Retry-After header expressed in seconds (HTTP dates are ignored).
+    """
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,267 @@
+import os
+import re
+import time
+import hashlib
+import sqlite3
+import threading
+import logging
+from .config import SEARCH_INDEX_ENABLED, SEARCH_INDEX_PATH, SEARCH_MAX_RESULTS
+from .map import NORMATTIVA_URN_CODICI
+from .metrics import timed
+
+# Splits an article URN into act, article and version:
+# ...N2Ls?urn:nir:stato:regio.decreto:1942-03-16;262:2~art1346bis!vig=
+ARTICLE_URN = re.compile(r"(?P<act>urn:[^~@!]+)~art(?P<article>[^@!]+)(?:@(?P<originale>originale)|!vig=(?P<date>[\d-]*))?$")
+
+# Terms of a query: "quoted phrases" or single words (a trailing * matches prefixes)
+QUERY_TERM = re.compile(r'"([^"]*)"|(\S+)')
+
+_ACT_LABELS = {urn: label for label, urn in NORMATTIVA_URN_CODICI.items()}
+
+def split_urn(urn):
+    """
+    Splits the URN of an article into its parts.
+
+    Arguments:
+    urn -- The URN of the article
+
+    Returns:
+    tuple -- (act URN, article, version, version date), or None if the URN is not an article
+    """
+    match = ARTICLE_URN.search(urn)
+    if match is None:
+        return None
+    version = "originale" if match["originale"] else "vigente"
+    return match["act"], match["article"].lower(), version, match["date"] or None
+
+def act_urn(url):
+    """
+    Returns the act part of a Normattiva URL or URN (e.g. 'urn:nir:stato:legge:2005-09-06;209').
+    """
+    act = url.split("?", 1)[-1]
+    return re.split(r"[~@!]", act, 1)[0]
+
+def act_label(act):
+    """
+    Human-readable name of an act URN: the name of the code, or the URN without its prefix.
+    """
+    return _ACT_LABELS.get(act.split("stato:", 1)[-1], act.split("stato:", 1)[-1])
+
+def normalize_article(articolo):
+    """
+    Brings an article number to the form used in URNs (e.g. 'art. 1346-bis' -> '1346bis').
+    """
+    articolo = re.sub(r'\b[Aa]rticoli?\b|\b[Aa]rt\.?', "", str(articolo))
+    return re.sub(r"[\s-]", "", articolo).lower()
+
+def build_query(text):
+    """
+    Converts a user query into an FTS5 expression.
+
+    Words and "quoted phrases" must all be present; a word ending in * matches
+    every word with that prefix. Everything else is taken literally, so user
+    input can never produce an invalid expression.
+
+    Arguments:
+    text -- The user query
+
+    Returns:
+    str -- The FTS5 MATCH expression
+
+    Raises:
+    ValueError -- If the query has no terms
+    """
+    terms = []
+    for phrase, word in QUERY_TERM.findall(text):
+        if phrase.strip():
+            terms.append(f'"{phrase}"')
+        elif word:
+            prefix = word.endswith("*")
+            word = word.replace('"', "").rstrip("*")
+            if word:
+                terms.append(f'"{word}"' + ("*" if prefix else ""))
+    if not terms:
+        raise ValueError("La ricerca non contiene termini")
+    return " ".join(terms)
+
+class SearchIndex:
+    """
+    Full-text index of the article texts, on SQLite FTS5.
+
+    Articles are added as they are extracted (by /scrape, batches and
+    mirrors), so the index grows with use and never needs a full rebuild.
+    Each URN holds the latest extracted text; re-indexing an unchanged text
+    is a no-op. Accents are folded, so 'proprieta' also finds 'proprietà'.
+    """
+    def __init__(self, path=SEARCH_INDEX_PATH):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS articles (
+                    id INTEGER PRIMARY KEY,
+                    urn TEXT NOT NULL UNIQUE,
+                    act TEXT NOT NULL,
+                    article TEXT NOT NULL,
+                    version TEXT NOT NULL,
+                    version_date TEXT,
+                    digest TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    indexed_at REAL NOT NULL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS articles_act ON articles (act, article)")
+            conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+                    text, content='articles', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+                )""")
+            # Keep the FTS table in sync with the articles table
+            conn.executescript("""
+                CREATE TRIGGER IF NOT EXISTS articles_ai AFTER INSERT ON articles BEGIN
+                    INSERT INTO articles_fts (rowid, text) VALUES (new.id, new.text);
+                END;
+                CREATE TRIGGER IF NOT EXISTS articles_ad AFTER DELETE ON articles BEGIN
+                    INSERT INTO articles_fts (articles_fts, rowid, text) VALUES ('delete', old.id, old.text);
+                END;
+                CREATE TRIGGER IF NOT EXISTS articles_au AFTER UPDATE OF text ON articles BEGIN
+                    INSERT INTO articles_fts (articles_fts, rowid, text) VALUES ('delete', old.id, old.text);
+                    INSERT INTO articles_fts (rowid, text) VALUES (new.id, new.text);
+                END;""")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def add(self, urn, text):
+        """
+        Adds or updates the text of an article.
+
+        Arguments:
+        urn -- The URN of the article
+        text -- The extracted article text
+
+        Returns:
+        bool -- False if the URN is not an article or the text is already indexed
+        """
+        parts = split_urn(urn)
+        if parts is None:
+            return False
+        digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO articles (urn, act, article, version, version_date, digest, text, indexed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (urn) DO UPDATE SET digest = excluded.digest, text = excluded.text, "
+                "indexed_at = excluded.indexed_at WHERE digest != excluded.digest",
+                (urn, *parts, digest, text, time.time()))
+        if cursor.rowcount:
+            logging.debug("Indexed article: %s", urn)
+        return bool(cursor.rowcount)
+
+    def search(self, query, act=None, article=None, version=None, limit=20):
+        """
+        Searches the indexed articles, ranked by relevance (BM25).
+
+        Arguments:
+        query -- Words and "quoted phrases" to look for (see build_query)
+        act -- Act URN to search in (optional, see act_urn)
+        article -- Article number (optional)
+        version -- 'vigente' or 'originale' (optional)
+        limit -- Maximum number of results
+
+        Returns:
+        list -- One dict per article: urn, tipo_atto, act, numero_articolo,
+                versione, data_versione, score and a snippet with the matches in «»
+
+        Raises:
+        ValueError -- If the query has no terms
+        """
+        sql = ("SELECT a.urn, a.act, a.article, a.version, a.version_date, bm25(articles_fts), "
+               "snippet(articles_fts, 0, '«', '»', '…', 24) "
+               "FROM articles_fts JOIN articles a ON a.id = articles_fts.rowid WHERE articles_fts MATCH ?")
+        params = [build_query(query)]
+        if act:
+            sql += " AND a.act = ?"
+            params.append(act)
+        if article:
+            sql += " AND a.article = ?"
+            params.append(normalize_article(article))
+        if version:
+            sql += " AND a.version = ?"
+            params.append(version)
+        sql += " ORDER BY bm25(articles_fts) LIMIT ?"
+        params.append(max(1, min(int(limit), SEARCH_MAX_RESULTS)))
+
+        with timed("search"):
+            rows = self._connect().execute(sql, params).fetchall()
+        return [{
+            'urn': urn,
+            'tipo_atto': act_label(act_part),
+            'act': act_part,
+            'numero_articolo': article_part,
+            'versione': version_part,
+            'data_versione': version_date,
+            # bm25() is lower for better matches
+            'score': round(-score, 4),
+            'snippet': snippet,
+        } for urn, act_part, article_part, version_part, version_date, score, snippet in rows]
+
+    def count(self):
+        """
+        Returns the number of indexed articles.
+        """
+        return self._connect().execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    def clear(self):
+        """
+        Removes every article from the index.
+        """
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM articles")
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_search_index():
+    """
+    Returns the process-wide search index, or None if it is disabled.
+    """
+    global _index
+    if not SEARCH_INDEX_ENABLED:
+        return None
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SearchIndex()
+    return _index
+
+def index_article(urn, text):
+    """
+    Adds an extracted article to the search index, if enabled.
+
+    Only called with successful extractions: the extractors raise on failure
+    instead of returning an error message. Never raises: a failure to index
+    must not fail the extraction.
+
+    Arguments:
+    urn -- The URN of the article
+    text -- The article text (empty texts are skipped)
+    """
+    if not text:
+        return
+    try:
+        index = get_search_index()
+        if index is not None:
+            with timed("index"):
+                index.add(urn, text)
+    except Exception as e:
+        logging.warning("Could not index %s: %s", urn, e)
@@ -0,0 +1,58 @@
+import threading
+import logging
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller runs the
+    function, and the callers arriving while it is in flight wait for it and
+    share its result (or its exception).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Runs fn(*args, **kwargs), unless a call with the same key is already in flight.
+
+        Arguments:
+        key -- Hashable key identifying the call (e.g. the URN)
+        fn -- The function to run
+
+        Returns:
+        The result of the call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+
+        if not leader:
+            logging.debug("Waiting for in-flight call: %s", key)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+            if call.waiters:
+                logging.debug("Shared in-flight call %s with %s waiters", key, call.waiters)
@@ -1,12 +1,17 @@
 import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
+from .config import DRIVER_POOL_SIZE, DRIVER_MAX_USES, DRIVER_IDLE_TIMEOUT, DRIVER_CHECKOUT_TIMEOUT
 
 drivers = []
 
-def setup_driver(download_dir=None):
+def create_driver(download_dir=None):
     """
-    Crea un nuovo driver configurato per gestire i download.
+    Crea un nuovo driver Chrome headless configurato per gestire i download.
     """
 
     if download_dir is None:
@@ -25,7 +30,13 @@ def setup_driver(download_dir=None):
     }
     chrome_options.add_experimental_option("prefs", prefs)
     
-    new_driver = webdriver.Chrome(options=chrome_options)
+    return webdriver.Chrome(options=chrome_options)
+
+def setup_driver(download_dir=None):
+    """
+    Crea un nuovo driver configurato per gestire i download.
+    """
+    new_driver = create_driver(download_dir)
     drivers.append(new_driver)
     return new_driver
 
@@ -37,3 +48,162 @@ def close_driver():
     for driver in drivers:
         driver.quit()
     drivers = []
+
+class DriverPool:
+    """
+    Bounded, thread-safe pool of headless browsers.
+
+    Browsers are checked out and back in instead of being created and quit
+    for every operation. A browser is health-checked on checkout, recycled
+    after `max_uses` checkouts and closed after `idle_timeout` seconds unused.
+    """
+    def __init__(self, max_size=DRIVER_POOL_SIZE, max_uses=DRIVER_MAX_USES, idle_timeout=DRIVER_IDLE_TIMEOUT, download_dir=None):
+        self.max_size = max_size
+        self.max_uses = max_uses
+        self.idle_timeout = idle_timeout
+        self.download_dir = download_dir
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._idle = []  # [(driver, last_used)], most recently used last
+        self._uses = {}  # id(driver) -> number of checkouts
+        self._reaper = None
+        self._closed = False
+
+    def _quit(self, driver):
+        self._uses.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception as e:
+            logging.warning("Error closing driver: %s", e)
+
+    @staticmethod
+    def _is_healthy(driver):
+        try:
+            driver.current_url
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _reset(driver):
+        # Close the extra windows left open (e.g. by the PDF export) and go back to the first one
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+
+    def _start_reaper(self):
+        if self._reaper is None and self.idle_timeout:
+            self._reaper = threading.Thread(target=self._reap_loop, name="driver-pool-reaper", daemon=True)
+            self._reaper.start()
+
+    def _reap_loop(self):
+        while not self._closed:
+            time.sleep(max(1, self.idle_timeout / 2))
+            self.reap_idle()
+
+    def reap_idle(self):
+        """
+        Closes the browsers that have been idle longer than `idle_timeout`.
+        """
+        now = time.time()
+        with self._lock:
+            expired = [d for d, last_used in self._idle if now - last_used > self.idle_timeout]
+            self._idle = [(d, last_used) for d, last_used in self._idle if now - last_used <= self.idle_timeout]
+        for driver in expired:
+            logging.info("Closing idle driver")
+            self._quit(driver)
+
+    def checkout(self, timeout=DRIVER_CHECKOUT_TIMEOUT):
+        """
+        Takes a browser from the pool, starting a new one if none is idle.
+
+        Arguments:
+        timeout -- Seconds to wait for a free slot
+
+        Returns:
+        WebDriver -- A healthy browser, to be returned with checkin()
+        """
+        if self._closed:
+            raise RuntimeError("Driver pool is closed")
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError("No browser available in the driver pool")
+        try:
+            self._start_reaper()
+            while True:
+                with self._lock:
+                    driver = self._idle.pop()[0] if self._idle else None
+                if driver is None:
+                    logging.info("Starting a new pooled driver")
+                    driver = create_driver(self.download_dir)
+                    self._uses[id(driver)] = 0
+                elif not self._is_healthy(driver):
+                    logging.warning("Discarding unhealthy pooled driver")
+                    self._quit(driver)
+                    continue
+                self._uses[id(driver)] += 1
+                return driver
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def checkin(self, driver, discard=False):
+        """
+        Returns a browser to the pool.
+
+        Arguments:
+        driver -- The browser obtained from checkout()
+        discard -- Close the browser instead of keeping it
+        """
+        try:
+            if not discard and not self._closed and self._uses.get(id(driver), 0) < self.max_uses:
+                try:
+                    self._reset(driver)
+                    with self._lock:
+                        self._idle.append((driver, time.time()))
+                    return
+                except Exception as e:
+                    logging.warning("Pooled driver could not be reset: %s", e)
+            self._quit(driver)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def driver(self, timeout=DRIVER_CHECKOUT_TIMEOUT):
+        """
+        Context manager that checks a browser out and back in.
+        """
+        driver = self.checkout(timeout)
+        discard = False
+        try:
+            yield driver
+        except BaseException:
+            discard = not self._is_healthy(driver)
+            raise
+        finally:
+            self.checkin(driver, discard=discard)
+
+    def close(self):
+        """
+        Closes every idle browser and stops accepting checkouts.
+        """
+        self._closed = True
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for driver, _ in idle:
+            self._quit(driver)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_driver_pool():
+    """
+    Returns the process-wide browser pool, creating it on first use.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = DriverPool()
+    return _pool
@@ -1,16 +1,11 @@
 import re
 import datetime
 from functools import lru_cache
+from .metrics import register_cache
 from .config import MAX_CACHE_SIZE
 from .map import NORMATTIVA, NORMATTIVA_SEARCH, BROCARDI_SEARCH
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO,
-                    format='%(asctime)s %(levelname)s %(message)s',
-                    handlers=[logging.FileHandler("norma.log"),
-                              logging.StreamHandler()])
-
 def nospazi(text):
     """
     Rimuove spazi multipli da una stringa.
@@ -21,14 +16,15 @@ def nospazi(text):
     Returns:
     str -- The text with single spaces between words
     """
-    logging.info(f"Removing extra spaces from text: {text}")
+    logging.debug("Removing extra spaces from text: %s", text)
     textlist = text.split()
     for t in textlist:
         t.strip()
     textout = ' '.join(textlist)
-    logging.info(f"Text after removing spaces: {textout}")
+    logging.debug("Text after removing spaces: %s", textout)
     return textout
 
+@register_cache
 @lru_cache(maxsize=MAX_CACHE_SIZE)
 def parse_date(input_date):
     """
@@ -41,7 +37,7 @@ def parse_date(input_date):
     Returns:
     str -- The formatted date string
     """
-    logging.info(f"Parsing date: {input_date}")
+    logging.debug("Parsing date: %s", input_date)
     
     month_map = {
         "gennaio": "01", "febbraio": "02", "marzo": "03", "aprile": "04",
@@ -58,7 +54,7 @@ def parse_date(input_date):
             logging.error("Invalid month found in date string")
             raise ValueError("Mese non valido")
         formatted_date = f"{year}-{month}-{day.zfill(2)}"
-        logging.info(f"Formatted date: {formatted_date}")
+        logging.debug("Formatted date: %s", formatted_date)
         return formatted_date
     
     try:
@@ -68,6 +64,7 @@ def parse_date(input_date):
         logging.error("Invalid date format")
         raise ValueError("Formato data non valido")
 
+@register_cache
 @lru_cache(maxsize=MAX_CACHE_SIZE)
 def normalize_act_type(input_type, search=False, source='normattiva'):
     """
@@ -81,7 +78,7 @@ def normalize_act_type(input_type, search=False, source='normattiva'):
     Returns:
     str -- The normalized act type
     """
-    logging.info(f"Normalizing act type: {input_type}, search: {search}, source: {source}")
+    logging.debug("Normalizing act type: %s, search: %s, source: %s", input_type, search, source)
     
     act_types = {}
     if source == 'normattiva':
@@ -94,12 +91,13 @@ def normalize_act_type(input_type, search=False, source='normattiva'):
     for key, value in act_types.items():
         if input_type == key or input_type == key.replace(" ", ""):
             normalized_type = value
-            logging.info(f"Normalized act type found: {normalized_type}")
+            logging.debug("Normalized act type found: %s", normalized_type)
             return normalized_type
 
-    logging.info(f"Returning input act type as normalized type: {input_type}")
+    logging.debug("Returning input act type as normalized type: %s", input_type)
     return input_type
 
+@register_cache
 @lru_cache(maxsize=MAX_CACHE_SIZE)
 def estrai_data_da_denominazione(denominazione):
     """
@@ -111,19 +109,20 @@ def estrai_data_da_denominazione(denominazione):
     Returns:
     str -- The extracted date or the original denominazione if no date is found
     """
-    logging.info(f"Extracting date from denomination: {denominazione}")
+    logging.debug("Extracting date from denomination: %s", denominazione)
     
     pattern = r"\b(\d{1,2})\s([Gg]ennaio|[Ff]ebbraio|[Mm]arzo|[Aa]prile|[Mm]aggio|[Gg]iugno|[Ll]uglio|[Aa]gosto|[Ss]ettembre|[Oo]ttobre|[Nn]ovembre|[Dd]icembre)\s(\d{4})\b"
     match = re.search(pattern, denominazione)
     
     if match:
         extracted_date = match.group(0)
-        logging.info(f"Extracted date: {extracted_date}")
+        logging.debug("Extracted date: %s", extracted_date)
         return extracted_date
     else:
-        logging.info("No date found in denomination")
+        logging.debug("No date found in denomination")
         return denominazione
 
+@register_cache
 @lru_cache(maxsize=MAX_CACHE_SIZE)
 def estrai_numero_da_estensione(estensione):
     """
@@ -135,7 +134,7 @@ def estrai_numero_da_estensione(estensione):
     Returns:
     int -- The extracted number or 0 if the extension is not found
     """
-    logging.info(f"Extracting number from extension: {estensione}")
+    logging.debug("Extracting number from extension: %s", estensione)
     
     estensioni_numeriche = {
         None: 0, 'bis': 2, 'tris': 3, 'ter': 3, 'quater': 4, 'quinquies': 5,
@@ -150,7 +149,7 @@ def estrai_numero_da_estensione(estensione):
     }
     
     number = estensioni_numeriche.get(estensione, 0)
-    logging.info(f"Extracted number: {number}")
+    logging.debug("Extracted number: %s", number)
     return number
 
 def get_annex_from_urn(urn):
@@ -163,12 +162,12 @@ def get_annex_from_urn(urn):
     Returns:
     str -- The annex number if found, otherwise None
     """
-    logging.info(f"Extracting annex from URN: {urn}")
+    logging.debug("Extracting annex from URN: %s", urn)
     
     ann_num = re.search(r":(\d+)(!vig=|@originale)$", urn)
     if ann_num:
         annex = ann_num.group(1)
-        logging.info(f"Extracted annex: {annex}")
+        logging.debug("Extracted annex: %s", annex)
         return annex
-    logging.info("No annex found in URN")
+    logging.debug("No annex found in URN")
     return None
@@ -1,77 +1,125 @@
 import requests
-from bs4 import BeautifulSoup
 from functools import lru_cache
+from .metrics import register_cache, timed
 from .config import MAX_CACHE_SIZE
-import logging
+from .doc_cache import fetch_document
+from .parsing import parse_html, find, has_class, get_text, MarkupError
 import re
 
-# Configure logging
-logging.basicConfig(level=logging.INFO,
-                    format='%(asctime)s %(levelname)s %(message)s',
-                    handlers=[logging.FileHandler("norma.log"),
-                              logging.StreamHandler()])
 
-@lru_cache(maxsize=MAX_CACHE_SIZE)
 def get_tree(normurn, link=False):
-    # Sending HTTP GET request to the provided URL
-    response = requests.get(normurn)
+    """
+    Restituisce la struttura dell'atto, o un messaggio di errore se la pagina
+    non è disponibile.
+    """
+    try:
+        return fetch_tree(normurn, link)
+    except requests.HTTPError as e:
+        return str(e)
+
+@register_cache
+@lru_cache(maxsize=MAX_CACHE_SIZE)
+@timed("get_tree")
+def fetch_tree(normurn, link=False):
+    """
+    Like get_tree, but raises http_client.UpstreamError when the page cannot
+    be fetched or has no tree (parsing.MarkupError), so that failures are
+    never memoized.
+    """
+    # Fetch the page, from the document cache when available
+    html = fetch_document(normurn)
+    
+    # Parse the HTML content of the page
+    doc = parse_html(html)
+    return estrai_albero(doc, normurn, link)
+
+@timed("extract_tree")
+def estrai_albero(doc, normurn, link=False):
+    """
+    Estrae la struttura dell'atto (div 'albero') da un documento già parsato.
+    
+    Arguments:
+    doc -- The document parsed with parsing.parse_html
+    normurn -- URN of the page, used to build article links
+    link -- Whether to return article links along with the article numbers
+    
+    Returns:
+    tuple -- (list of articles, count)
     
-    # Check if the request was successful
-    if response.status_code == 200:
-        # Parse the HTML content of the page
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Find the div with id 'albero'
-        tree = soup.find('div', id='albero')
-        
-        # Check if the div exists
-        if tree:
-            # Find all ul elements within the div
-            uls = tree.find_all('ul')
-            if uls:
-                result = []
-                count = 0
-                # Process each ul found
-                for ul in uls:
-                    # Extract all 'a' elements with class 'numero_articolo' within this ul
-                    list_items = ul.find_all('a', class_='numero_articolo')
+    Raises:
+    MarkupError -- If the document has no tree
+    """
+    # Find the div with id 'albero'
+    tree = find(doc, "//div[@id='albero']")
+    
+    # Check if the div exists
+    if tree is not None:
+        # Find all ul elements within the div
+        uls = tree.xpath('.//ul')
+        if uls:
+            result = []
+            count = 0
+            # Process each ul found
+            for ul in uls:
+                # Extract all 'a' elements with class 'numero_articolo' within this ul
+                list_items = ul.xpath(f".//a[{has_class('numero_articolo')}]")
+                
+                for a in list_items:
+                    # Check if the parent li element has classes that start with "agg" or contain "collapse"
+                    parent_li = next(a.iterancestors('li'), None)
+                    if parent_li is not None:
+                        classes = parent_li.get('class', '').split()
+                        if any(cls.startswith('agg') for cls in classes) or any('collapse' in cls for cls in classes):
+                            continue
                     
-                    for a in list_items:
-                        # Check if the parent li element has classes that start with "agg" or contain "collapse"
-                        parent_li = a.find_parent('li')
-                        if parent_li:
-                            classes = parent_li.get('class', [])
-                            if any(cls.startswith('agg') for cls in classes) or any('collapse' in cls for cls in classes):
-                                continue
-                        
-                        # Extract text and format it properly
-                        text_content = a.get_text(separator=" ", strip=True)
+                    # Extract text and format it properly
+                    text_content = get_text(a, separator=" ", strip=True)
+                    
+                    if "art." in text_content:
+                        text_content=text_content[5:]
                         
-                        if "art." in text_content:
-                            text_content=text_content[5:]
-                            
-                        if link:
-                            # Construct modified URL
-                            # Use regex to find the article part to replace in the normurn
-                            article_part = re.search(r'art\d+', normurn)
-                            if article_part:
-                                modified_url = normurn.replace(article_part.group(), 'art' + text_content.split()[0])
-                            else:
-                                modified_url = normurn  # fallback in case regex fails
-                            
-                            # Create dictionary with text content as key and modified URL as value
-                            item_dict = {text_content: modified_url}
-                            result.append(item_dict)
-                            count += 1
+                    if link:
+                        # Construct modified URL
+                        # Use regex to find the article part to replace in the normurn
+                        article_part = re.search(r'art\d+', normurn)
+                        if article_part:
+                            modified_url = normurn.replace(article_part.group(), 'art' + text_content.split()[0])
                         else:
-                            # If link is False, append only text content
-                            result.append(text_content)
-                    
-                return result, count
-            else:
-                return "No 'ul' element found within the 'albero' div"
+                            modified_url = normurn  # fallback in case regex fails
+                        
+                        # Create dictionary with text content as key and modified URL as value
+                        item_dict = {text_content: modified_url}
+                        result.append(item_dict)
+                        count += 1
+                    else:
+                        # If link is False, append only text content
+                        result.append(text_content)
+                
+            return result, count
         else:
-            return "Div with id 'albero' not found"
+            raise MarkupError("No 'ul' element found within the 'albero' div")
     else:
-        return f"Failed to retrieve the page, status code: {response.status_code}"
+        raise MarkupError("Div with id 'albero' not found")
 
+def articoli_da_albero(tree):
+    """
+    Converte le voci dell'albero restituite da get_tree in numeri di articolo
+    utilizzabili con generate_urn (es. '3 bis' -> '3-bis').
+    
+    Arguments:
+    tree -- The (articles, count) tuple returned by get_tree
+    
+    Returns:
+    list -- Article numbers, in tree order and without duplicates
+    """
+    articoli = []
+    for item in tree[0]:
+        label = next(iter(item)) if isinstance(item, dict) else item
+        match = re.match(r"(\d+)\s*-?\s*([a-zA-Z]+)?", label)
+        if not match:
+            continue
+        numero, estensione = match.groups()
+        articolo = f"{numero}-{estensione.lower()}" if estensione else numero
+        if articolo not in articoli:
+            articoli.append(articolo)
+    return articoli
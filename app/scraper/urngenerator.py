@@ -2,57 +2,73 @@ import re
 from .text_op import normalize_act_type, parse_date
 from .map import NORMATTIVA_URN_CODICI
 from functools import lru_cache
+from .metrics import register_cache, timed
 from .config import MAX_CACHE_SIZE
-from .sys_op import setup_driver, close_driver, drivers
+from .sys_op import get_driver_pool
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 from .text_op import estrai_data_da_denominazione
+from .date_registry import get_date_registry
+from .singleflight import SingleFlight
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO,
-                    format='%(asctime)s %(levelname)s %(message)s',
-                    handlers=[logging.FileHandler("norma.log"),
-                              logging.StreamHandler()])
+_inflight = SingleFlight()
 
-@lru_cache(maxsize=MAX_CACHE_SIZE)
 def complete_date(act_type, date, act_number):
     """
-    Completes the date of a legal norm using the Normattiva website.
+    Completes the date of a legal norm, using the local date registry when it
+    knows the act and the Normattiva website otherwise.
     Arguments:
     act_type -- Type of the legal act
     date -- Date of the act (year)
     act_number -- Number of the act
 
     Returns:
-    data_completa -- Completed date
+    data_completa -- Completed date, or an error message
     """
-    logging.info(f"Starting complete_date with act_type: {act_type}, date: {date}, act_number: {act_number}")
     try:
+        return _complete_date(act_type, date, act_number)
+    except Exception as e:
+        logging.error("Error in complete_date: %s", e, exc_info=True)
+        return f"Errore nel completamento della data, inserisci la data completa: {e}"
+
+# Raises on failure, so that only completed dates are memoized
+@register_cache
+@lru_cache(maxsize=MAX_CACHE_SIZE)
+def _complete_date(act_type, date, act_number):
+    logging.debug("Starting complete_date with act_type: %s, date: %s, act_number: %s", act_type, date, act_number)
+    registry = get_date_registry()
+    data_completa = registry.lookup(act_type, date, act_number)
+    if data_completa:
+        logging.debug("Completed date from registry: %s", data_completa)
+        return data_completa
 
-        driver = setup_driver()
+    with timed("complete_date"), get_driver_pool().driver() as driver:
         driver.get("https://www.normattiva.it/")
         search_box = driver.find_element(By.CSS_SELECTOR, "#testoRicerca")
         search_criteria = f"{act_type} {act_number} {date}"
-        logging.info(f"Search criteria: {search_criteria}")
+        logging.debug("Search criteria: %s", search_criteria)
         
         search_box.send_keys(search_criteria)
         WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.XPATH, "//*[@id=\"button-3\"]"))).click()
         elemento = WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.XPATH, '//*[@id="heading_1"]/p[1]/a')))
         elemento_text = elemento.text
-        logging.info(f"Element text found: {elemento_text}")
-        
-        data_completa = estrai_data_da_denominazione(elemento_text)
-        logging.info(f"Completed date: {data_completa}")
-        
-        return data_completa
-    except Exception as e:
-        logging.error(f"Error in complete_date: {e}", exc_info=True)
-        close_driver()
-        return f"Errore nel completamento della data, inserisci la data completa: {e}"
+        logging.debug("Element text found: %s", elemento_text)
+    
+    data_completa = estrai_data_da_denominazione(elemento_text)
+    logging.debug("Completed date: %s", data_completa)
+
+    try:
+        registry.record(act_type, date, act_number, data_completa, source="normattiva")
+    except ValueError:
+        logging.warning("Not recording unparsable date: %s", data_completa)
+    
+    return data_completa
+
+class _DateError(Exception):
+    pass
 
-@lru_cache(maxsize=MAX_CACHE_SIZE)
 def generate_urn(act_type, date=None, act_number=None, article=None, extension=None, version=None, version_date=None, urn_flag=True):
     """
     Generates the URN for a legal norm.
@@ -67,30 +83,42 @@ def generate_urn(act_type, date=None, act_number=None, article=None, extension=N
     urn_flag -- Boolean flag to include full URN or not
 
     Returns:
-    result -- The generated URN
+    result -- The generated URN, or (None, None) if the date of the act cannot be completed
     """
-    logging.info(f"Starting generate_urn with act_type: {act_type}, date: {date}, act_number: {act_number}, article: {article}, extension: {extension}, version: {version}, version_date: {version_date}, urn_flag: {urn_flag}")
+    try:
+        with timed("generate_urn"):
+            return _generate_urn(act_type, date, act_number, article, extension, version, version_date, urn_flag)
+    except _DateError:
+        return None, None
+
+# Raises _DateError instead of returning, so that failures are not memoized
+@register_cache
+@lru_cache(maxsize=MAX_CACHE_SIZE)
+def _generate_urn(act_type, date=None, act_number=None, article=None, extension=None, version=None, version_date=None, urn_flag=True):
+    logging.debug("Starting generate_urn with act_type: %s, date: %s, act_number: %s, article: %s, extension: %s, version: %s, version_date: %s, urn_flag: %s", act_type, date, act_number, article, extension, version, version_date, urn_flag)
     codici_urn = NORMATTIVA_URN_CODICI
     base_url = "https://www.normattiva.it/uri-res/N2Ls?urn:nir:stato:"
     normalized_act_type = normalize_act_type(act_type)
     
     if normalized_act_type in codici_urn:
         urn = codici_urn[normalized_act_type]
-        logging.info(f"Found URN in codici_urn: {urn}")
+        logging.debug("Found URN in codici_urn: %s", urn)
     else:
         try:
             if re.match(r"^\d{4}$", date) and act_number:
                 act_type_for_search = normalize_act_type(act_type, search=True)
-                full_date = complete_date(act_type=act_type_for_search, date=date, act_number=act_number)
+                # Concurrent lookups of the same act share one browser session
+                full_date = _inflight.do((act_type_for_search, date, act_number), _complete_date,
+                                         act_type=act_type_for_search, date=date, act_number=act_number)
                 formatted_date = parse_date(full_date)
             else:
                 formatted_date = parse_date(date)
-            logging.info(f"Formatted date: {formatted_date}")
+            logging.debug("Formatted date: %s", formatted_date)
         except Exception as e:
-            logging.error(f"Error generating URN: {e}", exc_info=True)
-            return None, None
+            logging.error("Error generating URN: %s", e, exc_info=True)
+            raise _DateError(e) from e
         urn = f"{normalized_act_type}:{formatted_date};{act_number}"
-        logging.info(f"Generated URN: {urn}")
+        logging.debug("Generated URN: %s", urn)
             
     if article:
         if "-" in article:
@@ -107,7 +135,7 @@ def generate_urn(act_type, date=None, act_number=None, article=None, extension=N
             urn += extension
         else:
             extension = ''
-        logging.info(f"Article part of URN: {urn}")
+        logging.debug("Article part of URN: %s", urn)
                 
     if version == "originale":
         urn += "@originale"
@@ -116,15 +144,16 @@ def generate_urn(act_type, date=None, act_number=None, article=None, extension=N
         if version_date:
             formatted_version_date = parse_date(version_date)
             urn += formatted_version_date
-        logging.info(f"Version part of URN: {urn}")
+        logging.debug("Version part of URN: %s", urn)
 
     full = base_url + urn
 
     result = full if urn_flag else full.split("~")[0]
-    logging.info(f"Final URN: {result}")
+    logging.debug("Final URN: %s", result)
     
     return result
 
+@register_cache
 @lru_cache(maxsize=MAX_CACHE_SIZE)
 def urn_to_filename(urn):
     """
@@ -135,7 +164,7 @@ def urn_to_filename(urn):
     Returns:
     filename -- The generated filename
     """
-    logging.info(f"Starting urn_to_filename with URN: {urn}")
+    logging.debug("Starting urn_to_filename with URN: %s", urn)
     
     # Estrarre la parte dell'URN tra 'stato:' e '~'
     try:
@@ -149,12 +178,12 @@ def urn_to_filename(urn):
         act_type, date = type_and_date.split(':')
         year = date.split('-')[0]  # Estrarre solo l'anno dalla data
         filename = f"{number}_{year}.pdf"
-        logging.info(f"Generated filename: {filename}")
+        logging.debug("Generated filename: %s", filename)
         return filename
     
     # Capitalizzare la prima lettera di `act_type_section`
     act_type = act_type_section.split('/')[-1]  # Rimuovere eventuali prefissi come '/'
     filename = f"{act_type.capitalize()}.pdf"
-    logging.info(f"Generated filename: {filename}")
+    logging.debug("Generated filename: %s", filename)
     return filename
 
@@ -1,15 +1,19 @@
 import requests
-from bs4 import BeautifulSoup
 from functools import lru_cache
+from .metrics import register_cache, timed
 import logging
 from .config import MAX_CACHE_SIZE
+from .doc_cache import fetch_document
+from .treextractor import estrai_albero
+from .parsing import parse_html, find, has_class, get_text, MarkupError
+from .singleflight import SingleFlight
+from .search_index import index_article
 
-# Configure logging
-logging.basicConfig(level=logging.INFO,
-                    format='%(asctime)s %(levelname)s %(message)s',
-                    handlers=[logging.FileHandler("norma.log"),
-                              logging.StreamHandler()])
 
+# Coalesces concurrent extractions of the same URN
+_inflight = SingleFlight()
+
+@register_cache
 @lru_cache(maxsize=MAX_CACHE_SIZE)
 def save_html(html_data, save_html_path):
     """
@@ -22,16 +26,17 @@ def save_html(html_data, save_html_path):
     Returns:
     str -- Path where the HTML is saved
     """
-    logging.info(f"Saving HTML to: {save_html_path}")
+    logging.debug("Saving HTML to: %s", save_html_path)
     try:
         with open(save_html_path, 'w', encoding='utf-8') as file:
             file.write(html_data)
-        logging.info(f"HTML saved successfully: {save_html_path}")
+        logging.debug("HTML saved successfully: %s", save_html_path)
         return f"HTML salvato in: {save_html_path}"
     except Exception as e:
-        logging.error(f"Error saving HTML: {e}", exc_info=True)
+        logging.error("Error saving HTML: %s", e, exc_info=True)
         return f"Errore durante il salvataggio dell'HTML: {e}"
 
+@register_cache
 @lru_cache(maxsize=MAX_CACHE_SIZE)
 def estrai_da_html(atto, comma=None):
     """
@@ -44,36 +49,53 @@ def estrai_da_html(atto, comma=None):
     Returns:
     str -- The extracted text or an error message
     """
-    logging.info(f"Extracting article from HTML. Comma: {comma}")
+    logging.debug("Extracting article from HTML. Comma: %s", comma)
     try:
-        soup = BeautifulSoup(atto, 'html.parser')
-        logging.info("Parsed HTML with BeautifulSoup")
-
-        corpo = soup.find('div', class_='bodyTesto')
-        logging.info("Found body of the document")
-
-        if not comma:
-            logging.info("No comma specified, returning full body text")
-            return corpo.text
-        else:
-            parsedcorpo = corpo.find('div', class_='art-commi-div-akn')
-            logging.info("Found parsed body for comma extraction")
-
-            commi = parsedcorpo.find_all('div', class_='art-comma-div-akn')
-            logging.info(f"Found {len(commi)} commi elements")
-
-            for c in commi:
-                comma_text = c.find('span', class_='comma-num-akn').text
-                logging.info(f"Checking comma: {comma_text}")
-                if f'{comma}.' in comma_text:
-                    extracted_text = c.text.strip()
-                    logging.info(f"Extracted comma text: {extracted_text}")
-                    return extracted_text
+        doc = parse_html(atto)
+        logging.debug("Parsed HTML with lxml")
+        return estrai_corpo(doc, comma)
     except Exception as e:
-        logging.error(f"Errore generico: {e}", exc_info=True)
+        logging.error("Errore generico: %s", e, exc_info=True)
         return f"Errore generico: {e}"
 
-@lru_cache(maxsize=MAX_CACHE_SIZE)
+@timed("extract_article")
+def estrai_corpo(doc, comma=None):
+    """
+    Estrae il testo di un articolo (o di un suo comma) da un documento già parsato.
+    
+    Arguments:
+    doc -- The document parsed with parsing.parse_html
+    comma -- The comma number to extract (optional)
+    
+    Returns:
+    str -- The extracted text, or None if the comma is not found
+    
+    Raises:
+    MarkupError -- If the document has no article body
+    """
+    corpo = find(doc, f"//div[{has_class('bodyTesto')}]")
+    if corpo is None:
+        raise MarkupError("Div 'bodyTesto' not found")
+    logging.debug("Found body of the document")
+
+    if not comma:
+        logging.debug("No comma specified, returning full body text")
+        return get_text(corpo)
+    else:
+        parsedcorpo = find(corpo, f".//div[{has_class('art-commi-div-akn')}]")
+        logging.debug("Found parsed body for comma extraction")
+
+        commi = parsedcorpo.xpath(f".//div[{has_class('art-comma-div-akn')}]")
+        logging.debug("Found %s commi elements", len(commi))
+
+        for c in commi:
+            comma_text = get_text(find(c, f".//span[{has_class('comma-num-akn')}]"))
+            logging.debug("Checking comma: %s", comma_text)
+            if f'{comma}.' in comma_text:
+                extracted_text = get_text(c).strip()
+                logging.debug("Extracted comma text: %s", extracted_text)
+                return extracted_text
+
 def extract_html_article(norma_visitata):
     """
     Estrae un articolo HTML da un oggetto NormaVisitata.
@@ -85,16 +107,142 @@ def extract_html_article(norma_visitata):
     str -- The extracted article text or None if not found
     """
     urn = norma_visitata.get_urn()
-    logging.info(f"Fetching HTML content from URN: {urn}")
     try:
-        response = requests.get(urn)
-        if response.status_code == 200:
-            html_content = response.text
-            logging.info("HTML content fetched successfully")
-            return estrai_da_html(atto=html_content, comma=None)
-        else:
-            logging.warning(f"Failed to fetch HTML content. Status code: {response.status_code}")
-            return None
+        return _inflight.do(('article', urn), _extract_html_article, urn)
+    except requests.HTTPError as e:
+        logging.warning("Failed to fetch HTML content: %s", e)
+        return None
     except Exception as e:
-        logging.error(f"Error fetching HTML content: {e}", exc_info=True)
+        logging.error("Error fetching HTML content: %s", e, exc_info=True)
         return None
+
+# The cached helpers below raise on failure, so that only successful
+# extractions are memoized
+@register_cache
+@lru_cache(maxsize=MAX_CACHE_SIZE)
+def _extract_html_article(urn):
+    logging.debug("Fetching HTML content from URN: %s", urn)
+    html_content = fetch_document(urn)
+    logging.debug("HTML content fetched successfully")
+    html_article = estrai_articolo(html_content)
+    index_article(urn, html_article)
+    return html_article
+
+def estrai_articolo(html):
+    """
+    Estrae il testo di un articolo da un documento HTML.
+    
+    Arguments:
+    html -- The HTML content of the article page
+    
+    Returns:
+    str -- The article text
+    
+    Raises:
+    MarkupError -- If the page has no article body
+    """
+    return estrai_corpo(parse_html(html))
+
+def extract_article_and_tree(norma_visitata, link=False):
+    """
+    Scarica una sola volta la pagina di un articolo ed estrae, dallo stesso
+    documento parsato, sia il testo dell'articolo sia la struttura dell'atto.
+    
+    Arguments:
+    norma_visitata -- The NormaVisitata object containing the URN
+    link -- Whether the tree should include article links
+    
+    Returns:
+    tuple -- (article text or None, tree or error message)
+    """
+    try:
+        return fetch_article_and_tree(norma_visitata.get_urn(), link)
+    except requests.HTTPError as e:
+        logging.warning("Failed to fetch HTML content: %s", e)
+        return None, str(e)
+    except Exception as e:
+        logging.error("Error fetching HTML content: %s", e, exc_info=True)
+        return None, f"Failed to retrieve the page: {e}"
+
+def fetch_article_and_tree(urn, link=False):
+    """
+    Like extract_article_and_tree, but takes the URN and raises on failure.
+    
+    Raises:
+    http_client.UpstreamError -- If the page cannot be fetched or lacks the expected markup
+    """
+    return _inflight.do(('article_tree', urn, link), _extract_article_and_tree, urn, link)
+
+@register_cache
+@lru_cache(maxsize=MAX_CACHE_SIZE)
+def _extract_article_and_tree(urn, link=False):
+    logging.debug("Fetching article and tree from URN: %s", urn)
+    html = fetch_document(urn)
+    html_article, tree = estrai_articolo_e_albero(html, urn, link)
+    index_article(urn, html_article)
+    return html_article, tree
+
+def estrai_articolo_e_albero(html, urn, link=False):
+    """
+    Estrae testo dell'articolo e struttura dell'atto da un'unica analisi della pagina.
+    
+    Arguments:
+    html -- The HTML content of the article page
+    urn -- URN of the page
+    link -- Whether the tree should include article links
+    
+    Returns:
+    tuple -- (article text, tree)
+    
+    Raises:
+    MarkupError -- If the page has no article body or no tree
+    """
+    doc = parse_html(html)
+    logging.debug("Parsed HTML with lxml")
+    return estrai_corpo(doc), estrai_albero(doc, urn, link)
+
+class _Page:
+    """
+    A downloaded page as a cache key: a version of a document is identified
+    by its URN and fetch time, so the HTML is left out of the key.
+    """
+    __slots__ = ("urn", "fetched_at", "html")
+
+    def __init__(self, urn, fetched_at, html):
+        self.urn = urn
+        self.fetched_at = fetched_at
+        self.html = html
+
+    def __eq__(self, other):
+        return (self.urn, self.fetched_at) == (other.urn, other.fetched_at)
+
+    def __hash__(self):
+        return hash((self.urn, self.fetched_at))
+
+def parse_article_and_tree(html, urn, fetched_at, link=False):
+    """
+    Like estrai_articolo_e_albero, memoized on the URN and fetch time of the
+    page: a refreshed page has a new fetch time, so it is parsed again.
+    
+    Arguments:
+    html -- The HTML content of the article page
+    urn -- URN of the page
+    fetched_at -- Timestamp at which the page was downloaded
+    link -- Whether the tree should include article links
+    
+    Returns:
+    tuple -- (article text, tree)
+    
+    Raises:
+    MarkupError -- If the page has no article body or no tree
+    """
+    return _parse_article_and_tree(_Page(urn, fetched_at, html), link)
+
+@register_cache
+@lru_cache(maxsize=MAX_CACHE_SIZE)
+def _parse_article_and_tree(page, link=False):
+    html_article, tree = estrai_articolo_e_albero(page.html, page.urn, link)
+    index_article(page.urn, html_article)
+    # The key stays in the cache, the page it was parsed from does not need to
+    page.html = None
+    return html_article, tree
@@ -0,0 +1,166 @@
+import requests
+from .scraper.batch import norma_visitata_from_request, scrape_batch, iter_batch, act_items
+from .scraper.mirror import mirror_act
+from .scraper.xlm_htmlextractor import fetch_article_and_tree, parse_article_and_tree
+from .scraper.doc_cache import fetch_document_stale
+from .scraper.search_index import get_search_index, act_urn
+from .scraper.norma import Norma
+
+class ScrapingService:
+    """
+    In-process scraping service shared by the Flask API and the CLI.
+    """
+    def visit(self, data):
+        """
+        Estrae un articolo e la struttura del suo atto.
+        
+        Arguments:
+        data -- A /scrape request payload
+        
+        Returns:
+        tuple -- (NormaVisitata with its tree, article text)
+        
+        Raises:
+        KeyError -- If tipo_atto or numero_articolo is missing
+        ValueError -- If the act cannot be identified
+        UpstreamError -- If the article page cannot be fetched
+        """
+        norma_visitata = norma_visitata_from_request(data)
+        html_content, norma_visitata.tree = fetch_article_and_tree(norma_visitata.get_urn())
+        return norma_visitata, html_content
+
+    def scrape(self, data):
+        """
+        Returns the /scrape response dictionary for a request payload.
+        """
+        norma_visitata, html_content = self.visit(data)
+        response_data = norma_visitata.to_dict()
+        response_data['html'] = html_content
+        return response_data
+
+    def scrape_stale(self, data):
+        """
+        Like scrape, but answers from the cached page even when it has expired,
+        refreshing it in the background (stale-while-revalidate).
+        
+        Arguments:
+        data -- A /scrape request payload
+        
+        Returns:
+        tuple -- (/scrape response dictionary, fetch timestamp of the page, cache status)
+        
+        Raises:
+        KeyError -- If tipo_atto or numero_articolo is missing
+        ValueError -- If the act cannot be identified
+        UpstreamError -- If the page is not cached and cannot be fetched
+        """
+        norma_visitata = norma_visitata_from_request(data)
+        urn = norma_visitata.get_urn()
+        html, fetched_at, status = fetch_document_stale(urn)
+        # Memoized on the fetch time, so a background refresh is parsed again
+        html_content, norma_visitata.tree = parse_article_and_tree(html, urn, fetched_at)
+        response_data = norma_visitata.to_dict()
+        response_data['html'] = html_content
+        return response_data, fetched_at, status
+
+    def scrape_batch(self, items):
+        """
+        Returns the results of a batch of request payloads, in request order.
+        """
+        return scrape_batch(items)
+
+    def search(self, query, tipo_atto=None, data=None, numero_atto=None, articolo=None, versione=None, limit=20):
+        """
+        Cerca un testo negli articoli già scaricati, in ordine di pertinenza.
+        
+        Arguments:
+        query -- Words and "quoted phrases" to look for
+        tipo_atto, data, numero_atto -- Act to search in (optional)
+        articolo -- Article number (optional)
+        versione -- 'vigente' or 'originale' (optional)
+        limit -- Maximum number of results
+        
+        Returns:
+        list -- The matching articles (see SearchIndex.search)
+        
+        Raises:
+        ValueError -- If the query has no terms or the act cannot be identified
+        RuntimeError -- If the search index is disabled
+        """
+        index = get_search_index()
+        if index is None:
+            raise RuntimeError("Indice di ricerca disabilitato")
+        act = None
+        if tipo_atto:
+            url = Norma(tipo_atto, data, numero_atto).url
+            if not isinstance(url, str):
+                raise ValueError(f"Atto non riconosciuto: {tipo_atto}")
+            act = act_urn(url)
+        return index.search(query, act=act, article=articolo, version=versione, limit=limit)
+
+    def iter_batch(self, items):
+        """
+        Yields (index, result) for a batch of request payloads as they are extracted.
+        """
+        return iter_batch(items)
+
+    def act_items(self, data):
+        """
+        Returns the tree of an act and the request payloads for all its articles.
+        """
+        return act_items(data)
+
+    async def scrape_async(self, data):
+        """
+        Asynchronous version of scrape (requires aiohttp).
+        """
+        from .scraper import aio
+        return await aio.scrape(data)
+
+    async def scrape_batch_async(self, items):
+        """
+        Asynchronous version of scrape_batch (requires aiohttp).
+        """
+        from .scraper import aio
+        return await aio.scrape_batch(items)
+
+    def mirror_act(self, data, dest=None, **kwargs):
+        """
+        Downloads every article of an act into a local mirror, yielding progress events.
+        """
+        return mirror_act(data, dest, **kwargs)
+
+class ScrapingClient:
+    """
+    Client for a remote VisuaLex API, with the same interface as ScrapingService.
+    """
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+
+    def scrape(self, data):
+        response = self.session.post(f"{self.base_url}/scrape", json=data)
+        response.raise_for_status()
+        return response.json()
+
+    def scrape_batch(self, items):
+        response = self.session.post(f"{self.base_url}/scrape/batch", json={'items': items})
+        response.raise_for_status()
+        return response.json()['results']
+
+    def search(self, query, limit=20, **filters):
+        params = {'q': query, 'limit': limit, **{key: value for key, value in filters.items() if value}}
+        response = self.session.get(f"{self.base_url}/search", params=params)
+        response.raise_for_status()
+        return response.json()['results']
+
+_service = None
+
+def get_service():
+    """
+    Returns the process-wide in-process scraping service.
+    """
+    global _service
+    if _service is None:
+        _service = ScrapingService()
+    return _service
@@ -0,0 +1,15 @@
+# Offline benchmarks: Normattiva and Brocardi pages are replayed through a
+# requests transport adapter, so results do not depend on the network.
+#
+#   python -m benchmarks.record          # record the real pages into fixtures/ (needs network)
+#   python -m benchmarks.run             # run and compare with baselines.json
+#   python -m benchmarks.run --save      # store the results as the new baselines
+#
+# Pages that were never recorded are replaced by synthetic ones with the same
+# markup (see synthetic.py). Baselines depend on the machine: save them again
+# before comparing on a different host.
+#
+# Load tests of the API, against a local fake upstream with injectable latency:
+#
+#   python -m benchmarks.loadtest --concurrency 32 --duration 60 --latency 0.3
+#   python -m benchmarks.fake_upstream --port 8081   # stand-in for an API started separately
@@ -0,0 +1,100 @@
+import time
+import random
+import hashlib
+import threading
+import click
+from functools import lru_cache
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from .synthetic import normattiva_page, brocardi_page
+
+# Local stand-in for Normattiva and Brocardi, serving the synthetic pages with
+# configurable latency and failures. Point the API at it with
+# VISUALEX_UPSTREAM_OVERRIDES (see app/scraper/config.py).
+
+@lru_cache(maxsize=4096)
+def _page(path):
+    if path.startswith("/uri-res/"):
+        html = normattiva_page("https://www.normattiva.it" + path)
+    else:
+        html = brocardi_page("https://www.brocardi.it" + path)
+    body = html.encode("utf-8")
+    return body, '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+
+class FakeUpstream(ThreadingHTTPServer):
+    """
+    HTTP server answering every GET with a synthetic page.
+
+    Arguments:
+    address -- (host, port); port 0 picks a free port
+    latency -- Base delay of every answer, in seconds
+    jitter -- Extra random delay, up to this many seconds
+    error_rate -- Share of requests answered with a 503
+    """
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), latency=0.0, jitter=0.0, error_rate=0.0):
+        super().__init__(address, _Handler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def start(self):
+        """
+        Serves in a background thread and returns the server.
+        """
+        threading.Thread(target=self.serve_forever, name="fake-upstream", daemon=True).start()
+        return self
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+        time.sleep(server.latency + random.uniform(0, server.jitter))
+        if random.random() < server.error_rate:
+            return self._send(503, b"Service Unavailable")
+        body, etag = _page(self.path)
+        if self.headers.get("If-None-Match") == etag:
+            return self._send(304, b"", etag)
+        self._send(200, body, etag)
+
+    def _send(self, status, body, etag=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+@click.command()
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", default=8081, show_default=True)
+@click.option("--latency", default=0.2, show_default=True, help="Ritardo base di ogni risposta (secondi)")
+@click.option("--jitter", default=0.1, show_default=True, help="Ritardo casuale aggiuntivo massimo (secondi)")
+@click.option("--error-rate", default=0.0, show_default=True, help="Quota di risposte 503")
+def main(host, port, latency, jitter, error_rate):
+    """
+    Avvia un finto Normattiva/Brocardi locale per i test di carico.
+    """
+    server = FakeUpstream((host, port), latency, jitter, error_rate)
+    click.echo(f"Fake upstream on {server.url}; start the API with:")
+    click.echo(f"  VISUALEX_UPSTREAM_OVERRIDES=https://www.normattiva.it={server.url},https://www.brocardi.it={server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import os
+import time
+import logging
+import random
+import tempfile
+import itertools
+import threading
+from bisect import bisect
+from collections import defaultdict
+import click
+import requests
+from .synthetic import act_articles, ACT_SIZES
+from .fake_upstream import FakeUpstream
+
+# Load generator for the VisuaLex API. Each worker thread sends requests in a
+# closed loop (next request as soon as the previous answer arrives), drawing
+# articles of the codice civile from a Zipf distribution so that a few hot
+# articles dominate, as in real traffic.
+
+CODICE_CIVILE = "codice civile"
+
+class ZipfArticles:
+    """
+    Draws article numbers with probability proportional to 1 / rank**s.
+
+    Ranks are assigned to the articles in a shuffled (but seeded) order, so
+    the hot articles are spread over the whole act.
+    """
+    def __init__(self, articles, s=1.1, seed=0):
+        self.articles = list(articles)
+        random.Random(seed).shuffle(self.articles)
+        weights = [1 / rank ** s for rank in range(1, len(self.articles) + 1)]
+        self.cum_weights = list(itertools.accumulate(weights))
+
+    def sample(self, rng):
+        point = rng.random() * self.cum_weights[-1]
+        return self.articles[min(bisect(self.cum_weights, point), len(self.articles) - 1)]
+
+def percentile(sorted_values, pct):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+class LoadTest:
+    """
+    Sends /scrape and /scrape/batch requests to `base_url` and collects latencies.
+
+    Arguments:
+    base_url -- URL of the API
+    concurrency -- Number of worker threads
+    duration -- Seconds to run
+    articles -- ZipfArticles to draw from
+    batch_ratio -- Share of requests sent to /scrape/batch
+    batch_size -- Articles per batch request
+    stale -- Whether /scrape uses the stale-while-revalidate mode
+    """
+    def __init__(self, base_url, concurrency, duration, articles, batch_ratio=0.0, batch_size=20, stale=False):
+        self.base_url = base_url.rstrip('/')
+        self.concurrency = concurrency
+        self.duration = duration
+        self.articles = articles
+        self.batch_ratio = batch_ratio
+        self.batch_size = batch_size
+        self.stale = stale
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def _request(self, session, rng):
+        if rng.random() < self.batch_ratio:
+            items = [{'tipo_atto': CODICE_CIVILE, 'numero_articolo': self.articles.sample(rng)}
+                     for _ in range(self.batch_size)]
+            response = session.post(f"{self.base_url}/scrape/batch", json={'items': items}, timeout=300)
+            failed = response.status_code != 200 or response.json().get('errors', 0) > 0
+            return '/scrape/batch', failed
+        url = f"{self.base_url}/scrape" + ("?stale=1" if self.stale else "")
+        response = session.post(url, json={'tipo_atto': CODICE_CIVILE, 'numero_articolo': self.articles.sample(rng)},
+                                timeout=300)
+        return '/scrape', response.status_code != 200
+
+    def _worker(self, seed, deadline):
+        rng = random.Random(seed)
+        session = requests.Session()
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                endpoint, failed = self._request(session, rng)
+            except requests.RequestException:
+                endpoint, failed = 'connection', True
+            elapsed = time.perf_counter() - started
+            with self.lock:
+                self.latencies[endpoint].append(elapsed)
+                if failed:
+                    self.errors[endpoint] += 1
+
+    def run(self):
+        """
+        Runs the load test.
+
+        Returns:
+        dict -- Per endpoint: requests, errors, error_rate, rps, p50/p95/p99 latency (ms)
+        """
+        started = time.perf_counter()
+        deadline = started + self.duration
+        workers = [threading.Thread(target=self._worker, args=(seed, deadline), daemon=True)
+                   for seed in range(self.concurrency)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+
+        report = {}
+        for endpoint, latencies in sorted(self.latencies.items()):
+            latencies.sort()
+            report[endpoint] = {
+                'requests': len(latencies),
+                'errors': self.errors[endpoint],
+                'error_rate': self.errors[endpoint] / len(latencies),
+                'rps': len(latencies) / elapsed,
+                'p50_ms': percentile(latencies, 50) * 1000,
+                'p95_ms': percentile(latencies, 95) * 1000,
+                'p99_ms': percentile(latencies, 99) * 1000,
+            }
+        return report
+
+def spawn_stack(latency, jitter, error_rate):
+    """
+    Starts a fake upstream and the Flask API in this process, wired together.
+
+    Returns:
+    tuple -- (API base URL, FakeUpstream)
+    """
+    upstream = FakeUpstream(latency=latency, jitter=jitter, error_rate=error_rate).start()
+    os.environ['VISUALEX_UPSTREAM_OVERRIDES'] = (
+        f"https://www.normattiva.it={upstream.url},https://www.brocardi.it={upstream.url}")
+    # A fresh document cache and search index, so that runs start cold and do not touch the real ones
+    tmp_dir = tempfile.mkdtemp()
+    os.environ.setdefault('VISUALEX_DOC_CACHE_PATH', os.path.join(tmp_dir, 'documents.sqlite3'))
+    os.environ.setdefault('VISUALEX_SEARCH_INDEX_PATH', os.path.join(tmp_dir, 'search.sqlite3'))
+    os.environ.setdefault('VISUALEX_LOG_FILE', '')
+    os.environ.setdefault('VISUALEX_LOG_LEVEL', 'WARNING')
+
+    # Imported here: the configuration is read from the environment at import time
+    from werkzeug.serving import make_server
+    from app import create_app
+    server = make_server('127.0.0.1', 0, create_app(), threaded=True)
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    threading.Thread(target=server.serve_forever, name="api", daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", upstream
+
+@click.command()
+@click.option("--url", default=None, help="URL dell'API da testare (default: avvia API e finto upstream in locale)")
+@click.option("--concurrency", default=16, show_default=True, help="Richieste in parallelo")
+@click.option("--duration", default=30.0, show_default=True, help="Durata del test (secondi)")
+@click.option("--zipf-s", default=1.1, show_default=True, help="Esponente della distribuzione Zipf sugli articoli")
+@click.option("--batch-ratio", default=0.0, show_default=True, help="Quota di richieste a /scrape/batch")
+@click.option("--batch-size", default=20, show_default=True, help="Articoli per richiesta batch")
+@click.option("--stale", is_flag=True, help="Usa /scrape?stale=1")
+@click.option("--latency", default=0.2, show_default=True, help="Latenza del finto upstream (solo senza --url)")
+@click.option("--jitter", default=0.1, show_default=True, help="Latenza casuale aggiuntiva del finto upstream")
+@click.option("--error-rate", default=0.0, show_default=True, help="Quota di 503 del finto upstream")
+def main(url, concurrency, duration, zipf_s, batch_ratio, batch_size, stale, latency, jitter, error_rate):
+    """
+    Test di carico di /scrape e /scrape/batch con un mix di articoli Zipf.
+    """
+    upstream = None
+    if url is None:
+        url, upstream = spawn_stack(latency, jitter, error_rate)
+        click.echo(f"API on {url}, fake upstream on {upstream.url} (latency {latency}s + {jitter}s jitter)")
+
+    articles = ZipfArticles([label.replace(' ', '-') for label in act_articles(ACT_SIZES["regio.decreto:1942-03-16;262"])],
+                            s=zipf_s)
+    test = LoadTest(url, concurrency, duration, articles, batch_ratio, batch_size, stale)
+    click.echo(f"Running {concurrency} workers for {duration:.0f}s against {url}")
+    report = test.run()
+
+    click.echo(f"{'endpoint':<15} {'requests':>9} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>8}")
+    for endpoint, row in report.items():
+        click.echo(f"{endpoint:<15} {row['requests']:>9} {row['rps']:>8.1f} {row['p50_ms']:>9.1f} "
+                   f"{row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['error_rate']:>8.1%}")
+    if upstream is not None:
+        click.echo(f"{upstream.requests} upstream requests")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+from app.scraper.urngenerator import generate_urn
+from app.scraper.brocardi import article_index
+
+# Pages replayed by the benchmarks (and downloaded by benchmarks.record)
+
+CODICE_CIVILE = "codice civile"
+ACTS = {
+    CODICE_CIVILE: ("1", "2", "3", "5", "832", "978", "1140", "1218", "1321", "1453",
+                    "1470", "1571", "1655", "2043", "2049", "2051", "2059", "2082", "2697", "2909"),
+    "costituzione": ("1", "2", "3", "13", "21", "32", "41", "97", "111", "117"),
+}
+BROCARDI_CODICE_CIVILE = "https://www.brocardi.it/codice-civile/"
+
+def article_urn(act, article):
+    return generate_urn(act, article=article, version="vigente")
+
+def act_urn(act):
+    return generate_urn(act, version="vigente")
+
+def brocardi_urls():
+    index = article_index()
+    urls = (index.get((BROCARDI_CODICE_CIVILE, article)) for article in ACTS[CODICE_CIVILE])
+    return [url for url in urls if url]
+
+BENCH_URLS = ([act_urn(act) for act in ACTS]
+              + [article_urn(act, article) for act, articles in ACTS.items() for article in articles]
+              + brocardi_urls())
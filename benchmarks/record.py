@@ -0,0 +1,34 @@
+import os
+import json
+import click
+import requests
+from .replay import FIXTURES_DIR, INDEX, fixture_name, load_index
+from .pages import BENCH_URLS
+
+@click.command()
+@click.option("--dest", default=FIXTURES_DIR, show_default=True, help="Cartella delle fixture")
+@click.option("--force", is_flag=True, help="Scarica di nuovo anche le pagine già registrate")
+def record(dest, force):
+    """
+    Registra le pagine usate dai benchmark (richiede la rete).
+    """
+    os.makedirs(dest, exist_ok=True)
+    index = load_index(dest)
+    session = requests.Session()
+    for url in BENCH_URLS:
+        if url in index and not force:
+            continue
+        response = session.get(url, timeout=(5, 30))
+        if response.status_code != 200:
+            click.echo(f"{response.status_code} {url}", err=True)
+            continue
+        name = fixture_name(url)
+        with open(os.path.join(dest, name), "w", encoding="utf-8") as f:
+            f.write(response.text)
+        index[url] = name
+        click.echo(f"recorded {url}")
+    with open(os.path.join(dest, INDEX), "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+
+if __name__ == "__main__":
+    record()
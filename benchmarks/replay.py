@@ -0,0 +1,76 @@
+import os
+import json
+import hashlib
+from requests import Response
+from requests.adapters import BaseAdapter
+from app.scraper import http_client
+from .synthetic import page_for
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+INDEX = "index.json"
+HOSTS = ("https://www.normattiva.it", "https://www.brocardi.it")
+
+def fixture_name(url):
+    return hashlib.sha1(url.encode("utf-8")).hexdigest() + ".html"
+
+def load_index(fixtures_dir=FIXTURES_DIR):
+    path = os.path.join(fixtures_dir, INDEX)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+class ReplayAdapter(BaseAdapter):
+    """
+    requests transport adapter answering from recorded pages, falling back
+    to synthetic ones for URLs that were never recorded.
+    """
+    def __init__(self, fixtures_dir=FIXTURES_DIR, synthetic=True):
+        super().__init__()
+        self.fixtures_dir = fixtures_dir
+        self.index = load_index(fixtures_dir)
+        self.synthetic = synthetic
+        self.requests = 0
+        self.recorded = 0
+        self._pages = {}
+
+    def page(self, url):
+        if url not in self._pages:
+            html = None
+            name = self.index.get(url)
+            if name:
+                with open(os.path.join(self.fixtures_dir, name), encoding="utf-8") as f:
+                    html = f.read()
+                self.recorded += 1
+            elif self.synthetic:
+                html = page_for(url)
+            self._pages[url] = html
+        return self._pages[url]
+
+    def send(self, request, **kwargs):
+        self.requests += 1
+        html = self.page(request.url)
+        response = Response()
+        response.url = request.url
+        response.request = request
+        response.status_code = 200 if html is not None else 404
+        response.headers["Content-Type"] = "text/html; charset=utf-8"
+        response._content = (html or "").encode("utf-8")
+        response.encoding = "utf-8"
+        return response
+
+    def close(self):
+        pass
+
+def install(session=None, **kwargs):
+    """
+    Mounts a ReplayAdapter for Normattiva and Brocardi on the shared HTTP session.
+
+    Returns:
+    ReplayAdapter -- The mounted adapter
+    """
+    session = session or http_client.get_session()
+    adapter = ReplayAdapter(**kwargs)
+    for host in HOSTS:
+        session.mount(host, adapter)
+    return adapter
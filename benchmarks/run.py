@@ -0,0 +1,171 @@
+import os
+
+# Benchmarks run offline and quietly: no persistent cache or index, no throttling, no log file
+os.environ.setdefault("VISUALEX_DOC_CACHE_ENABLED", "0")
+os.environ.setdefault("VISUALEX_SEARCH_INDEX_ENABLED", "0")
+os.environ.setdefault("VISUALEX_HOST_RATE", "1e9")
+os.environ.setdefault("VISUALEX_HOST_MAX_RATE", "1e9")
+os.environ.setdefault("VISUALEX_LOG_FILE", "")
+os.environ.setdefault("VISUALEX_LOG_LEVEL", "WARNING")
+
+import json
+import time
+import statistics
+import click
+from app import create_app
+from app.scraper.norma import Norma, NormaVisitata
+from app.scraper.treextractor import fetch_tree
+from app.scraper.xlm_htmlextractor import estrai_da_html, _extract_article_and_tree, _extract_html_article
+from app.scraper.urngenerator import generate_urn, _generate_urn
+from app.scraper.brocardi import BrocardiScraper
+from . import replay
+from .pages import ACTS, CODICE_CIVILE, act_urn, article_urn
+
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+BENCHMARKS = {}
+
+def benchmark(name):
+    """
+    Registers a benchmark: a function that runs one round and returns the number of operations.
+    """
+    def register(fn):
+        BENCHMARKS[name] = fn
+        return fn
+    return register
+
+def _articles():
+    return [(act, article) for act, articles in ACTS.items() for article in articles]
+
+@benchmark("generate_urn")
+def bench_generate_urn(adapter):
+    _generate_urn.cache_clear()
+    articles = _articles()
+    for act, article in articles:
+        generate_urn(act, article=article, version="vigente")
+    return len(articles)
+
+@benchmark("get_tree")
+def bench_get_tree(adapter):
+    # Tree of the codice civile, the largest 'albero' in the fixtures
+    fetch_tree.cache_clear()
+    fetch_tree(act_urn(CODICE_CIVILE))
+    return 1
+
+@benchmark("estrai_da_html")
+def bench_estrai_da_html(adapter):
+    estrai_da_html.cache_clear()
+    pages = [adapter.page(article_urn(act, article)) for act, article in _articles()]
+    for html in pages:
+        estrai_da_html(html)
+    return len(pages)
+
+def _visited(articles):
+    norma = Norma(CODICE_CIVILE)
+    return [NormaVisitata(norma, article, "vigente") for article in articles]
+
+@benchmark("brocardi_look_up")
+def bench_brocardi_look_up(adapter):
+    scraper = BrocardiScraper()
+    norme = _visited(ACTS[CODICE_CIVILE])
+    for norma_visitata in norme:
+        scraper.look_up(norma_visitata)
+    return len(norme)
+
+@benchmark("brocardi_get_info")
+def bench_brocardi_get_info(adapter):
+    scraper = BrocardiScraper()
+    norme = _visited(ACTS[CODICE_CIVILE])
+    for norma_visitata in norme:
+        scraper.get_info(norma_visitata)
+    return len(norme)
+
+def _scrape_all(client):
+    articles = _articles()
+    for act, article in articles:
+        response = client.post('/scrape', json={'tipo_atto': act, 'numero_articolo': article})
+        assert response.status_code == 200, response.get_data(as_text=True)
+    return len(articles)
+
+@benchmark("scrape_cold")
+def bench_scrape_cold(adapter):
+    # Every article fetched and parsed: only the replayed upstream is free
+    for cached in (_extract_article_and_tree, _extract_html_article, fetch_tree, estrai_da_html):
+        cached.cache_clear()
+    return _scrape_all(_client())
+
+@benchmark("scrape_warm")
+def bench_scrape_warm(adapter):
+    return _scrape_all(_client())
+
+_app = None
+
+def _client():
+    global _app
+    if _app is None:
+        _app = create_app()
+    return _app.test_client()
+
+def run_benchmark(fn, adapter, rounds):
+    """
+    Runs a benchmark `rounds` times after a warm-up round.
+
+    Returns:
+    float -- Median operations per second
+    """
+    fn(adapter)
+    rates = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        ops = fn(adapter)
+        rates.append(ops / (time.perf_counter() - started))
+    return statistics.median(rates)
+
+def load_baselines(path=BASELINES):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+@click.command()
+@click.option("--rounds", default=5, show_default=True, help="Round misurati per benchmark")
+@click.option("--only", multiple=True, help="Esegue solo i benchmark indicati")
+@click.option("--save", is_flag=True, help="Salva i risultati come nuove baseline")
+@click.option("--tolerance", default=0.2, show_default=True, help="Calo massimo rispetto alla baseline")
+@click.option("--check", is_flag=True, help="Esce con errore se un benchmark è sotto la baseline oltre la tolleranza")
+def main(rounds, only, save, tolerance, check):
+    """
+    Esegue i benchmark offline e li confronta con le baseline salvate.
+    """
+    adapter = replay.install()
+    baselines = load_baselines()
+    results = {}
+    regressions = []
+    click.echo(f"{'benchmark':<20} {'ops/s':>12} {'baseline':>12} {'change':>8}")
+    for name, fn in BENCHMARKS.items():
+        if only and name not in only:
+            continue
+        rate = results[name] = run_benchmark(fn, adapter, rounds)
+        baseline = baselines.get(name)
+        change = ""
+        if baseline:
+            ratio = rate / baseline - 1
+            change = f"{ratio:+.0%}"
+            if ratio < -tolerance:
+                regressions.append(name)
+                change += " !"
+        click.echo(f"{name:<20} {rate:>12.1f} {baseline or '-':>12} {change:>8}")
+    click.echo(f"{adapter.requests} upstream requests replayed ({adapter.recorded} from recorded pages)")
+
+    if save:
+        baselines.update({name: round(rate, 1) for name, rate in results.items()})
+        with open(BASELINES, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        click.echo(f"Baselines saved to {BASELINES}")
+    if regressions:
+        click.echo(f"Regressions: {', '.join(regressions)}", err=True)
+        if check:
+            raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
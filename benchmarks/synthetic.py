@@ -0,0 +1,85 @@
+import re
+import random
+
+# Stand-ins for pages that have not been recorded, with the same markup the
+# extractors look for. They are deterministic, so runs stay comparable.
+
+ACT_SIZES = {
+    "regio.decreto:1942-03-16;262": 2969,  # codice civile
+    "costituzione": 139,
+}
+DEFAULT_ACT_SIZE = 300
+EXTENSIONS = ("bis", "ter", "quater")
+
+def act_articles(size):
+    """
+    Returns the article labels of a synthetic act, with some 'bis'/'ter' articles.
+    """
+    rng = random.Random(size)
+    labels = []
+    for number in range(1, size + 1):
+        labels.append(str(number))
+        if rng.random() < 0.08:
+            labels.extend(f"{number} {ext}" for ext in EXTENSIONS[:rng.randint(1, 3)])
+    return labels
+
+def _commi(article, count=4):
+    words = ("usufrutto", "proprietà", "possesso", "obbligazione", "contratto", "danno",
+             "risarcimento", "diritto", "termine", "condizione")
+    rng = random.Random(article)
+    return "".join(
+        f'<div class="art-comma-div-akn"><span class="comma-num-akn">{n}.</span> '
+        + " ".join(rng.choice(words) for _ in range(60)) + ".</div>\n"
+        for n in range(1, count + 1))
+
+def normattiva_page(url):
+    """
+    Builds a Normattiva article page (act tree + article text) for a URN.
+    """
+    act = re.search(r"urn:nir:stato:([^~!@]+)", url)
+    act = act.group(1) if act else ""
+    size = next((size for key, size in ACT_SIZES.items() if key in act), DEFAULT_ACT_SIZE)
+    article = re.search(r"~art([0-9a-z]+)", url)
+    article = article.group(1) if article else "1"
+
+    items = []
+    for label in act_articles(size):
+        items.append(f'<li class="albero-articolo"><a class="numero_articolo" href="#">art. {label}</a></li>')
+        if label.endswith("0"):
+            # Amended versions listed in the tree, which the extractor skips
+            items.append(f'<li class="agg1 collapse"><a class="numero_articolo" href="#">art. {label}</a></li>')
+    return (
+        "<html><head><title>Normattiva</title></head><body>\n"
+        '<div id="albero"><ul>\n' + "\n".join(items) + "\n</ul></div>\n"
+        f'<div class="bodyTesto"><h2 class="article-num-akn">Art. {article}</h2>\n'
+        f'<div class="art-commi-div-akn">\n{_commi(article)}</div></div>\n'
+        "</body></html>")
+
+def brocardi_page(url):
+    """
+    Builds a Brocardi article page with breadcrumb, brocardi, ratio, spiegazione and massime.
+    """
+    article = re.search(r"art([0-9a-z]+)\.html", url)
+    article = article.group(1) if article else "1"
+    text = _commi(article, count=1)
+    return (
+        "<html><body>\n"
+        '<div id="breadcrumb">Sei in: Brocardi.it &gt; Codice Civile &gt; Libro IV &gt; '
+        f"Art. {article}</div>\n"
+        '<div class="panes-condensed panes-w-ads content-ext-guide content-mark">\n'
+        '<div class="brocardi-content">Neminem laedere</div>\n'
+        '<div class="brocardi-content">Qui iure suo utitur neminem laedit</div>\n'
+        f'<div class="container-ratio"><div class="corpoDelTesto">{text}</div></div>\n'
+        f"<h3>Spiegazione dell'art. {article}</h3><div class=\"text\">{text * 3}</div>\n"
+        f"<h3>Massime relative all'art. {article}</h3><div class=\"text\">{text * 5}</div>\n"
+        "</div></body></html>")
+
+def page_for(url):
+    """
+    Returns the synthetic page for a URL, or None for unknown hosts.
+    """
+    if "normattiva.it" in url:
+        return normattiva_page(url)
+    if "brocardi.it" in url:
+        return brocardi_page(url)
+    return None
@@ -4,19 +4,83 @@ from rich.table import Table
 from rich.prompt import Prompt
 from rich.tree import Tree
 from rich.panel import Panel
-from app import create_app
+from rich.progress import Progress
+from rich.markup import escape
+from app.service import ScrapingClient, get_service
 from app.scraper.map import NORMATTIVA_SEARCH, TIPI_ATTI_CON_DATA_E_NUMERO
 from app.scraper.norma import Norma, NormaVisitata
+from app.scraper.date_registry import get_date_registry
+from app.scraper.mirror import mirror_act, index_mirror
+from app.scraper.config import BATCH_MAX_WORKERS, MIRROR_RATE
+from app.scraper.logs import setup_logging
 import requests
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
 
 console = Console()
 
+PREFETCH_WINDOW = 3  # articles warmed on each side of the current one
+
+class ArticlePrefetcher:
+    """
+    Fetches article texts in background threads and keeps them in a local cache,
+    so that moving to a neighbouring article does not wait on the network.
+    """
+    def __init__(self, fetch, max_workers=2, max_entries=256):
+        self.fetch = fetch
+        self.max_entries = max_entries
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self.futures = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _submit(self, article):
+        with self.lock:
+            future = self.futures.get(article)
+            if future is None or (future.done() and future.exception() is not None):
+                future = self.executor.submit(self.fetch, article)
+                self.futures[article] = future
+            self.futures.move_to_end(article)
+            while len(self.futures) > self.max_entries:
+                self.futures.popitem(last=False)
+            return future
+
+    def get(self, article):
+        """
+        Returns the text of an article, waiting for it if it is still being fetched.
+        """
+        return self._submit(article).result()
+
+    def seed(self, article, text):
+        """
+        Stores an article text that is already known.
+        """
+        future = Future()
+        future.set_result(text)
+        with self.lock:
+            self.futures[article] = future
+
+    def prefetch(self, articles):
+        """
+        Starts fetching the given articles in background.
+        """
+        for article in articles:
+            self._submit(article)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
 @click.group()
-def cli():
-    pass
+@click.option("--server", envvar="VISUALEX_SERVER", default=None,
+              help="URL di un server VisuaLex (es. http://127.0.0.1:5000). Se omesso, le ricerche sono eseguite in locale.")
+@click.pass_context
+def cli(ctx, server):
+    setup_logging()
+    ctx.obj = ScrapingClient(server) if server else get_service()
 
 @cli.command()
-def menu():
+@click.pass_obj
+def menu(service):
     console.print("[bold green]Benvenuto nell'app CLI![/bold green]")
     norma_visitata = None
     while True:
@@ -27,14 +91,94 @@ def menu():
         scelta = Prompt.ask("Seleziona un'opzione", choices=["1", "2"])
 
         if scelta == "1":
-            norma_visitata, html_content, tree = cerca_norma()
+            norma_visitata, html_content, tree = cerca_norma(service)
             if norma_visitata:
-                visualizza_dettagli_norma(norma_visitata, html_content, tree)
+                visualizza_dettagli_norma(service, norma_visitata, html_content, tree)
         elif scelta == "2":
             console.print("[bold red]Arrivederci![/bold red]")
             break
 
-def cerca_norma():
+@cli.command(name="importa-date")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+def importa_date(path):
+    """Importa nel registro locale le date degli atti da un file CSV o JSON."""
+    count = get_date_registry().import_file(path)
+    console.print(f"[bold green]Importate {count} date nel registro.[/bold green]")
+
+@cli.command()
+@click.argument("tipo_atto")
+@click.option("--data", default=None, help="Data dell'atto (es. 2005-09-06)")
+@click.option("--numero-atto", default=None, help="Numero dell'atto")
+@click.option("--versione", default="vigente", show_default=True)
+@click.option("--data-versione", default=None, help="Data della versione (opzionale)")
+@click.option("--dest", default=None, help="Cartella di destinazione (default: mirror/<atto>)")
+@click.option("--workers", default=BATCH_MAX_WORKERS, show_default=True, help="Download in parallelo")
+@click.option("--rate", default=MIRROR_RATE, show_default=True, help="Articoli al secondo")
+def mirror(tipo_atto, data, numero_atto, versione, data_versione, dest, workers, rate):
+    """Scarica tutti gli articoli di un atto in una copia locale (riprende i download interrotti)."""
+    act = {
+        'tipo_atto': NORMATTIVA_SEARCH.get(tipo_atto.lower(), tipo_atto),
+        'data': data,
+        'numero_atto': numero_atto,
+        'versione': versione,
+        'data_versione': data_versione,
+    }
+    try:
+        with Progress(console=console) as progress:
+            task = None
+            for event in mirror_act(act, dest, max_workers=workers, rate=rate):
+                if event['event'] == 'start':
+                    console.print(f"Copia locale in [bold]{event['dest']}[/bold]: {event['todo']} articoli da scaricare su {event['total']}")
+                    task = progress.add_task("Download", total=event['total'], completed=event['total'] - event['todo'])
+                elif event['event'] == 'article':
+                    progress.advance(task)
+                    if event['error']:
+                        progress.console.print(f"[red]Art. {event['numero_articolo']}: {event['error']}[/red]")
+                elif event['event'] == 'done':
+                    console.print(f"[bold green]Completato:[/bold green] {event['fetched']} scaricati, {event['errors']} errori")
+    except (ValueError, requests.HTTPError) as e:
+        console.print(f"[bold red]Errore: {escape(str(e))}[/bold red]")
+
+@cli.command(name="cerca-testo")
+@click.argument("query")
+@click.option("--atto", "tipo_atto", default=None, help="Cerca solo in un atto (es. c.c.)")
+@click.option("--data", default=None, help="Data dell'atto")
+@click.option("--numero-atto", default=None, help="Numero dell'atto")
+@click.option("--articolo", default=None, help="Cerca solo in un articolo")
+@click.option("--versione", type=click.Choice(["vigente", "originale"]), default=None)
+@click.option("--limit", default=20, show_default=True, help="Numero massimo di risultati")
+@click.pass_obj
+def cerca_testo(service, query, tipo_atto, data, numero_atto, articolo, versione, limit):
+    """Cerca parole o "frasi esatte" negli articoli già scaricati."""
+    if tipo_atto:
+        tipo_atto = NORMATTIVA_SEARCH.get(tipo_atto.lower(), tipo_atto)
+    try:
+        results = service.search(query, tipo_atto=tipo_atto, data=data, numero_atto=numero_atto,
+                                 articolo=articolo, versione=versione, limit=limit)
+    except (ValueError, RuntimeError, requests.HTTPError) as e:
+        console.print(f"[bold red]Errore: {escape(str(e))}[/bold red]")
+        return
+    if not results:
+        console.print("[yellow]Nessun articolo trovato. L'indice contiene solo gli articoli già scaricati.[/yellow]")
+        return
+    table = Table(title=f"Risultati per {escape(query)}")
+    table.add_column("Atto")
+    table.add_column("Art.")
+    table.add_column("Estratto")
+    for result in results:
+        snippet = escape(result['snippet']).replace("«", "[bold yellow]").replace("»", "[/bold yellow]")
+        versione_label = "" if result['versione'] == "vigente" else f" ({result['versione']})"
+        table.add_row(escape(result['tipo_atto']), result['numero_articolo'] + versione_label, snippet)
+    console.print(table)
+
+@cli.command()
+@click.argument("dest", type=click.Path(exists=True, file_okay=False))
+def indicizza(dest):
+    """Aggiunge all'indice di ricerca gli articoli di una copia locale."""
+    count = index_mirror(dest)
+    console.print(f"[bold green]Indicizzati {count} articoli.[/bold green]")
+
+def cerca_norma(service):
     tipo_atto = Prompt.ask("Inserisci il tipo di atto (es. c.c., c.p., costituzione)")
     tipo_atto = NORMATTIVA_SEARCH.get(tipo_atto.lower(), tipo_atto)
     
@@ -53,40 +197,35 @@ def cerca_norma():
     else:
         data_versione = None
 
-    app = create_app()
-    with app.app_context():
-        url = 'http://127.0.0.1:5000/scrape'  # URL dell'API
-        payload = {
-            'tipo_atto': tipo_atto,
-            'data': data,
-            'numero_atto': numero_atto,
-            'numero_articolo': numero_articolo,
-            'versione': versione,
-            'data_versione': data_versione if data_versione else None
-        }
-        try:
-            response = requests.post(url, json=payload)
-            if response.status_code == 200:
-                response_data = response.json()
-                html_content = response_data.get('html', 'No content found')
-                norma = Norma(tipo_atto, data, numero_atto, payload.get('url'))
-                norma_visitata = NormaVisitata(
-                    norma=norma,
-                    numero_articolo=numero_articolo,
-                    versione=versione,
-                    data_versione=data_versione,
-                    tree=response_data.get('tree'),
-                    urn=response_data.get('urn'),
-                    timestamp=response_data.get('timestamp')
-                )
-                return norma_visitata, html_content, norma_visitata.tree
-            else:
-                console.print(f"Error: {response.status_code}")
-        except requests.exceptions.RequestException as e:
-            console.print(f"Request failed: {e}")
+    payload = {
+        'tipo_atto': tipo_atto,
+        'data': data,
+        'numero_atto': numero_atto,
+        'numero_articolo': numero_articolo,
+        'versione': versione,
+        'data_versione': data_versione if data_versione else None
+    }
+    try:
+        response_data = service.scrape(payload)
+        html_content = response_data.get('html') or 'No content found'
+        norma = Norma(tipo_atto, data, numero_atto, payload.get('url'))
+        norma_visitata = NormaVisitata(
+            norma=norma,
+            numero_articolo=numero_articolo,
+            versione=versione,
+            data_versione=data_versione,
+            tree=response_data.get('tree'),
+            urn=response_data.get('urn'),
+            timestamp=response_data.get('timestamp')
+        )
+        return norma_visitata, html_content, norma_visitata.tree
+    except requests.exceptions.RequestException as e:
+        console.print(f"Request failed: {e}")
+    except Exception as e:
+        console.print(f"Error: {e}")
     return None, None, None
 
-def visualizza_dettagli_norma(norma_visitata, html_content, tree):
+def visualizza_dettagli_norma(service, norma_visitata, html_content, tree):
     def add_to_tree(tree_view, items, selected_article):
         for item in items:
             if isinstance(item, dict):
@@ -105,29 +244,40 @@ def visualizza_dettagli_norma(norma_visitata, html_content, tree):
         end = min(len(articles_list), target_index + window // 2 + 1)
         return articles_list[start:end]
 
-    def fetch_article_text(norma_visitata, article_number):
-        app = create_app()
-        with app.app_context():
-            url = 'http://127.0.0.1:5000/scrape'  # URL dell'API
-            payload = {
-                'tipo_atto': norma_visitata.tipo_atto_str,
-                'data': norma_visitata.data,
-                'numero_atto': norma_visitata.numero_atto,
-                'numero_articolo': article_number,
-                'versione': norma_visitata.versione,
-                'data_versione': norma_visitata.data_versione if norma_visitata.data_versione else None
-            }
-            try:
-                response = requests.post(url, json=payload)
-                if response.status_code == 200:
-                    response_data = response.json()
-                    return response_data.get('html', 'No content found')
-                else:
-                    console.print(f"Error: {response.status_code}")
-            except requests.exceptions.RequestException as e:
-                console.print(f"Request failed: {e}")
+    def scrape_article_text(norma_visitata, article_number):
+        payload = {
+            'tipo_atto': norma_visitata.tipo_atto_str,
+            'data': norma_visitata.data,
+            'numero_atto': norma_visitata.numero_atto,
+            'numero_articolo': article_number,
+            'versione': norma_visitata.versione,
+            'data_versione': norma_visitata.data_versione if norma_visitata.data_versione else None
+        }
+        response_data = service.scrape(payload)
+        return response_data.get('html') or 'No content found'
+
+    def fetch_article_text(article_number):
+        try:
+            return prefetcher.get(article_number)
+        except requests.exceptions.RequestException as e:
+            console.print(f"Request failed: {e}")
+        except Exception as e:
+            console.print(f"Error: {e}")
         return 'No content found'
 
+    def neighbours(tree, current_article, window=PREFETCH_WINDOW):
+        articles_list = tree[0]
+        if current_article not in articles_list:
+            return []
+        current_index = articles_list.index(current_article)
+        after = articles_list[current_index + 1:current_index + 1 + window]
+        before = articles_list[max(0, current_index - window):current_index][::-1]
+        # Interleave so that the closest articles are fetched first
+        ordered = []
+        for i in range(window):
+            ordered.extend(a[i] for a in (after, before) if i < len(a))
+        return ordered
+
     def navigate_articles(tree, current_article):
         while True:
             tree_slice = get_tree_slice(tree, current_article)
@@ -135,7 +285,8 @@ def visualizza_dettagli_norma(norma_visitata, html_content, tree):
             add_to_tree(tree_view, tree_slice, current_article)
             console.clear()
 
-            article_text = fetch_article_text(norma_visitata, current_article)
+            article_text = fetch_article_text(current_article)
+            prefetcher.prefetch(neighbours(tree, current_article))
             table = Table(title="Dettagli Norma Visitata")
             table.add_column("Campo", justify="right", style="cyan", no_wrap=True)
             table.add_column("Valore", style="magenta")
@@ -162,7 +313,12 @@ def visualizza_dettagli_norma(norma_visitata, html_content, tree):
                 break
 
     if tree:
-        navigate_articles(tree, norma_visitata.numero_articolo)
+        prefetcher = ArticlePrefetcher(lambda article: scrape_article_text(norma_visitata, article))
+        prefetcher.seed(norma_visitata.numero_articolo, html_content)
+        try:
+            navigate_articles(tree, norma_visitata.numero_articolo)
+        finally:
+            prefetcher.close()
     else:
         console.print("No tree structure available")
 
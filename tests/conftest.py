@@ -0,0 +1,6 @@
+import os
+
+# The tests never touch the persistent stores
+os.environ.setdefault("VISUALEX_DOC_CACHE_ENABLED", "0")
+os.environ.setdefault("VISUALEX_SEARCH_INDEX_ENABLED", "0")
+os.environ.setdefault("VISUALEX_LOG_FILE", "")
@@ -0,0 +1,55 @@
+import asyncio
+import json
+import pytest
+from app import create_app
+from app.asgi import app as asgi_app
+
+UNRESOLVABLE = {'tipo_atto': 'legge', 'numero_articolo': '1'}
+MISSING_ACT_TYPE = {'numero_articolo': '1'}
+
+@pytest.fixture
+def client():
+    return create_app().test_client()
+
+def asgi_post(path, body):
+    messages = []
+    async def receive():
+        return {'type': 'http.request', 'body': json.dumps(body).encode(), 'more_body': False}
+    async def send(message):
+        messages.append(message)
+    scope = {'type': 'http', 'method': 'POST', 'path': path}
+    asyncio.run(asgi_app(scope, receive, send))
+    return messages[0]['status'], json.loads(messages[1]['body'])
+
+@pytest.mark.parametrize("body, message", [(UNRESOLVABLE, "Atto non riconosciuto"), (MISSING_ACT_TYPE, "Campo mancante")])
+def test_scrape_rejects_invalid_requests(client, body, message):
+    response = client.post('/scrape', json=body)
+    assert response.status_code == 400
+    assert message in response.json['error']
+    status, content = asgi_post('/scrape', body)
+    assert status == 400
+    assert message in content['error']
+
+@pytest.mark.parametrize("body", [UNRESOLVABLE, MISSING_ACT_TYPE])
+def test_stale_scrape_rejects_invalid_requests(client, body):
+    response = client.post('/scrape?stale=1', json=body)
+    assert response.status_code == 400
+    assert response.is_json
+
+def test_stale_scrape_parses_each_page_version_once(client, monkeypatch):
+    from app import service
+    from app.scraper import xlm_htmlextractor
+    from tests.test_extraction import ARTICLE_PAGE
+    versions = [(ARTICLE_PAGE, 100.0, 'stale'), (ARTICLE_PAGE, 100.0, 'stale'), (ARTICLE_PAGE, 200.0, 'hit')]
+    monkeypatch.setattr(service, "fetch_document_stale", lambda urn: versions.pop(0))
+    parsed = []
+    parse = xlm_htmlextractor.estrai_articolo_e_albero
+    monkeypatch.setattr(xlm_htmlextractor, "estrai_articolo_e_albero",
+                        lambda *args: parsed.append(args[1]) or parse(*args))
+    xlm_htmlextractor._parse_article_and_tree.cache_clear()
+    body = {'tipo_atto': 'codice civile', 'numero_articolo': '1'}
+    for status in ('STALE', 'STALE', 'HIT'):
+        response = client.post('/scrape?stale=1', json=body)
+        assert response.headers['X-Cache'] == status
+        assert response.json['tree'] == [["1", "2"], 0]
+    assert len(parsed) == 2
@@ -0,0 +1,69 @@
+import asyncio
+import pytest
+from app import create_app
+from app.scraper import aio, batch, treextractor, xlm_htmlextractor
+from app.scraper.batch import act_items, act_from_request, norma_visitata_from_request
+from app.scraper.http_client import UpstreamError
+from tests.test_extraction import ARTICLE_PAGE
+
+CODICE_CIVILE = "https://www.normattiva.it/uri-res/N2Ls?urn:nir:stato:regio.decreto:1942-03-16;262:2~art{}!vig="
+ITEMS = [{'tipo_atto': 'codice civile', 'numero_articolo': '1'},
+         {'tipo_atto': 'codice civile', 'numero_articolo': '2'}]
+
+@pytest.fixture
+def upstream(monkeypatch):
+    # URN -> page; missing URNs answer 404
+    pages = {}
+    def fetch(urn):
+        if urn not in pages:
+            raise UpstreamError("Failed to retrieve the page, status code: 404", status=404)
+        return pages[urn]
+    async def fetch_async(urn):
+        return fetch(urn)
+    monkeypatch.setattr(treextractor, "fetch_document", fetch)
+    monkeypatch.setattr(xlm_htmlextractor, "fetch_document", fetch)
+    monkeypatch.setattr(aio, "fetch_document", fetch_async)
+    for cached in (treextractor.fetch_tree, xlm_htmlextractor._extract_html_article,
+                   xlm_htmlextractor._extract_article_and_tree):
+        cached.cache_clear()
+    return pages
+
+def test_unresolvable_act():
+    with pytest.raises(ValueError, match="Atto non riconosciuto"):
+        act_from_request({'tipo_atto': 'legge'})
+    with pytest.raises(ValueError, match="Atto non riconosciuto"):
+        act_items({'tipo_atto': 'legge'})
+    with pytest.raises(ValueError, match="Atto non riconosciuto"):
+        norma_visitata_from_request({'tipo_atto': 'legge', 'numero_articolo': '1'})
+
+def test_stream_route_reports_unresolvable_acts():
+    response = create_app().test_client().post('/scrape/stream', json={'tipo_atto': 'legge'})
+    assert response.is_json
+    assert "Atto non riconosciuto" in response.json['error']
+
+@pytest.mark.parametrize("scrape", [batch.scrape_batch, lambda items: asyncio.run(aio.scrape_batch(items))])
+def test_failed_tree_owner_does_not_leak_its_error(upstream, scrape):
+    upstream[CODICE_CIVILE.format(2)] = ARTICLE_PAGE
+    failed, extracted = scrape(ITEMS)
+    assert "404" in failed['error']
+    assert 'error' not in extracted
+    assert extracted['tree'] == (["1", "2"], 0)
+
+@pytest.mark.parametrize("scrape", [batch.scrape_batch, lambda items: asyncio.run(aio.scrape_batch(items))])
+def test_missing_tree_is_none(upstream, scrape):
+    upstream[CODICE_CIVILE.format(2)] = ARTICLE_PAGE.replace('id="albero"', 'id="altro"')
+    failed, extracted = scrape(ITEMS)
+    assert "error" in failed
+    assert extracted['tree'] is None
+
+def test_unresolvable_batch_item(upstream):
+    invalid, valid = batch.scrape_batch([{'tipo_atto': 'legge', 'numero_articolo': '1'}, ITEMS[0]])
+    assert "Atto non riconosciuto" in invalid['error']
+    assert "404" in valid['error']
+
+def test_stream_route_status_codes(upstream):
+    client = create_app().test_client()
+    assert client.post('/scrape/stream', json={'tipo_atto': 'legge'}).status_code == 400
+    response = client.post('/scrape/stream', json={'tipo_atto': 'codice civile'})
+    assert response.status_code == 502
+    assert "404" in response.json['error']
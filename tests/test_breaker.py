@@ -0,0 +1,122 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from app.scraper import aio, http_client
+from app.scraper.breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+
+def open_breaker(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    assert breaker.state == OPEN
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("host", failure_threshold=3, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.start() is None
+    assert breaker.retry_in() > 59
+
+def test_single_trial_when_half_open():
+    breaker = CircuitBreaker("host", failure_threshold=1, reset_timeout=0)
+    open_breaker(breaker)
+    assert breaker.start() == HALF_OPEN
+    assert breaker.start() is None
+
+def test_trial_outcome_closes_or_reopens():
+    breaker = CircuitBreaker("host", failure_threshold=1, reset_timeout=0)
+    open_breaker(breaker)
+    breaker.start()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    breaker.start()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.start() == CLOSED
+
+def test_released_trial_lets_another_through():
+    breaker = CircuitBreaker("host", failure_threshold=1, reset_timeout=60)
+    open_breaker(breaker)
+    breaker.opened_at -= 60
+    assert breaker.start() == HALF_OPEN
+    breaker.release_trial()
+    assert breaker.state == OPEN
+    assert breaker.start() == HALF_OPEN
+
+def test_release_after_outcome_is_a_no_op():
+    breaker = CircuitBreaker("host", failure_threshold=1, reset_timeout=0)
+    open_breaker(breaker)
+    breaker.start()
+    breaker.record_success()
+    breaker.release_trial()
+    assert breaker.state == CLOSED
+
+@pytest.fixture
+def breaker(monkeypatch):
+    breaker = CircuitBreaker("host", failure_threshold=2, reset_timeout=0)
+    monkeypatch.setattr(http_client, "get_breaker", lambda url: breaker)
+    monkeypatch.setattr(http_client, "backoff_delay", lambda attempt: 0)
+    return breaker
+
+def scripted_send(monkeypatch, outcomes):
+    def send(url, timeout, **kwargs):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return SimpleNamespace(status_code=outcome)
+    monkeypatch.setattr(http_client, "_send", send)
+
+def test_throttled_trial_reopens_the_circuit(monkeypatch, breaker):
+    scripted_send(monkeypatch, [503, 503, 429, 200])
+    assert http_client.get("http://host/", retries=1).status_code == 503
+    assert breaker.state == OPEN
+    # The trial is throttled: the circuit must reopen, not stay half-open
+    assert http_client.get("http://host/", retries=0).status_code == 429
+    assert breaker.state == OPEN
+    assert http_client.get("http://host/", retries=0).status_code == 200
+    assert breaker.state == CLOSED
+
+def test_throttling_alone_does_not_open_the_circuit(monkeypatch, breaker):
+    scripted_send(monkeypatch, [429, 429, 429])
+    assert http_client.get("http://host/", retries=2).status_code == 429
+    assert breaker.state == CLOSED
+
+def test_unexpected_error_on_trial_releases_it(monkeypatch, breaker):
+    scripted_send(monkeypatch, [503, 503, KeyboardInterrupt(), 200])
+    http_client.get("http://host/", retries=1)
+    with pytest.raises(KeyboardInterrupt):
+        http_client.get("http://host/", retries=0)
+    assert breaker.state == OPEN
+    assert http_client.get("http://host/", retries=0).status_code == 200
+    assert breaker.state == CLOSED
+
+def test_request_errors_count_as_failures(monkeypatch, breaker):
+    scripted_send(monkeypatch, [http_client.requests.exceptions.ChunkedEncodingError("cut")] * 2)
+    with pytest.raises(http_client.UpstreamError):
+        http_client.get("http://host/", retries=1)
+    assert breaker.state == OPEN
+
+def test_cancelled_async_trial_releases_it(monkeypatch, breaker):
+    monkeypatch.setattr(aio, "check_circuit", http_client.check_circuit)
+    monkeypatch.setattr(aio, "backoff_delay", lambda attempt: 0)
+    open_breaker(breaker)
+
+    async def hang(url, **kwargs):
+        await asyncio.sleep(3600)
+
+    async def cancel_trial():
+        monkeypatch.setattr(aio, "_send", hang)
+        task = asyncio.ensure_future(aio.get("http://host/", retries=0))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_trial())
+    assert breaker.state == OPEN
+    assert breaker.start() == HALF_OPEN
@@ -0,0 +1,40 @@
+import json
+import pytest
+from app.scraper import urngenerator
+from app.scraper.date_registry import DateRegistry
+
+@pytest.fixture
+def registry(tmp_path):
+    return DateRegistry(str(tmp_path / "act_dates.sqlite3"))
+
+@pytest.mark.parametrize("imported, requested", [
+    ("d.lgs.", "decreto legislativo"),
+    ("decreto.legislativo", "d.lgs."),
+    ("d.p.r.", "decreto del presidente della repubblica"),
+    ("decreto del presidente della repubblica", "dpr"),
+    ("Legge", "l."),
+])
+def test_aliases_share_the_key(registry, imported, requested):
+    registry.record(imported, "2005", "206", "2005-09-06")
+    assert registry.lookup(requested, "2005", "206") == "2005-09-06"
+
+@pytest.mark.parametrize("act_type", ["d.lgs.", "decreto legislativo", "d.p.r.", "decreto.del.presidente.della.repubblica"])
+def test_generate_urn_uses_imported_dates(monkeypatch, registry, act_type):
+    registry.record(act_type, "2005", "206", "2005-09-06")
+    monkeypatch.setattr(urngenerator, "get_date_registry", lambda: registry)
+    monkeypatch.setattr(urngenerator, "get_driver_pool", lambda: pytest.fail("browser started"))
+    urngenerator._complete_date.cache_clear()
+    urngenerator._generate_urn.cache_clear()
+    urn = urngenerator.generate_urn(urngenerator.normalize_act_type(act_type), date="2005", act_number="206")
+    assert urn.endswith(":2005-09-06;206")
+
+def test_import_skips_invalid_rows(tmp_path, registry):
+    path = tmp_path / "dates.json"
+    path.write_text(json.dumps([
+        {"act_type": "d.lgs.", "number": "206", "date": "2005-09-06"},
+        {"act_type": "legge", "number": "1", "date": None},
+        {"act_type": "legge", "number": "2", "date": "not a date"},
+        {"act_type": "legge", "date": "2000-01-01"},
+    ]))
+    assert registry.import_file(str(path)) == 1
+    assert registry.lookup("decreto legislativo", "2005", "206") == "2005-09-06"
@@ -0,0 +1,51 @@
+from types import SimpleNamespace
+import pytest
+from app.scraper import doc_cache
+from app.scraper.doc_cache import DocumentCache, is_immutable
+
+URN = "https://www.normattiva.it/uri-res/N2Ls?urn:nir:stato:legge:2000-01-01;1~art1@originale"
+DOCUMENT = '<html><div class="bodyTesto">Art. 1</div></html>'
+MAINTENANCE_PAGE = "<html><h1>Sito in manutenzione</h1></html>"
+
+@pytest.fixture
+def cache(tmp_path):
+    return DocumentCache(str(tmp_path / "documents.sqlite3"))
+
+@pytest.fixture
+def upstream(monkeypatch):
+    responses = []
+    def get(url, **kwargs):
+        status, text, headers = responses.pop(0)
+        return SimpleNamespace(status_code=status, text=text, headers=headers)
+    monkeypatch.setattr(doc_cache.http_client, "get", get)
+    return responses
+
+def test_documents_are_stored(cache, upstream):
+    upstream.append((200, DOCUMENT, {"ETag": '"v1"'}))
+    assert doc_cache._download(URN, cache) == DOCUMENT
+    entry = cache.lookup(URN)
+    assert entry.html == DOCUMENT
+    assert entry.etag == '"v1"'
+
+def test_pages_without_normattiva_markup_are_not_stored(cache, upstream):
+    upstream.append((200, MAINTENANCE_PAGE, {}))
+    assert doc_cache._download(URN, cache) == MAINTENANCE_PAGE
+    assert cache.lookup(URN) is None
+
+def test_not_modified_refreshes_the_entry(cache, upstream):
+    cache.put(URN, DOCUMENT, '"v1"')
+    entry = cache.lookup(URN)
+    upstream.append((304, "", {}))
+    assert doc_cache._download(URN, cache, entry) == DOCUMENT
+    assert cache.lookup(URN).fetched_at >= entry.fetched_at
+
+def test_errors_raise(cache, upstream):
+    upstream.append((404, "Not found", {}))
+    with pytest.raises(doc_cache.http_client.UpstreamError):
+        doc_cache._download(URN, cache)
+    assert cache.lookup(URN) is None
+
+def test_immutable_urns():
+    assert is_immutable(URN)
+    assert is_immutable(URN.replace("@originale", "!vig=2020-01-01"))
+    assert not is_immutable(URN.replace("@originale", "!vig="))
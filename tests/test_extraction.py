@@ -0,0 +1,69 @@
+import pytest
+from app.scraper import treextractor, xlm_htmlextractor
+from app.scraper.norma import Norma, NormaVisitata
+from app.scraper.parsing import MarkupError
+
+URN = "https://www.normattiva.it/uri-res/N2Ls?urn:nir:stato:legge:2000-01-01;1~art1!vig="
+
+ARTICLE_PAGE = """<html><body>
+<div id="albero"><ul>
+<li><a class="numero_articolo">art. 1</a></li>
+<li><a class="numero_articolo">art. 2</a></li>
+</ul></div>
+<div class="bodyTesto"><h2 class="article-num-akn">Art. 1</h2><div>Testo dell'articolo.</div></div>
+</body></html>"""
+
+MAINTENANCE_PAGE = "<html><body><h1>Sito in manutenzione</h1></body></html>"
+
+@pytest.fixture
+def pages(monkeypatch):
+    pages = []
+    fetch = lambda urn: pages.pop(0)
+    monkeypatch.setattr(treextractor, "fetch_document", fetch)
+    monkeypatch.setattr(xlm_htmlextractor, "fetch_document", fetch)
+    for cached in (treextractor.fetch_tree, xlm_htmlextractor._extract_html_article,
+                   xlm_htmlextractor._extract_article_and_tree):
+        cached.cache_clear()
+    return pages
+
+def norma_visitata():
+    return NormaVisitata(Norma("legge", "2000-01-01", "1", url="act"), "1", urn=URN)
+
+def test_missing_body_is_not_memoized(pages):
+    pages.extend([MAINTENANCE_PAGE, ARTICLE_PAGE])
+    assert xlm_htmlextractor.extract_html_article(norma_visitata()) is None
+    assert xlm_htmlextractor.extract_html_article(norma_visitata()).startswith("Art. 1")
+
+def test_missing_tree_is_not_memoized(pages):
+    pages.extend([MAINTENANCE_PAGE, ARTICLE_PAGE])
+    assert treextractor.get_tree(URN) == "Div with id 'albero' not found"
+    assert treextractor.get_tree(URN) == (["1", "2"], 0)
+
+def test_article_and_tree_from_maintenance_page(pages):
+    pages.extend([MAINTENANCE_PAGE, ARTICLE_PAGE])
+    text, tree = xlm_htmlextractor.extract_article_and_tree(norma_visitata())
+    assert text is None
+    assert tree == "Div 'bodyTesto' not found"
+    text, tree = xlm_htmlextractor.extract_article_and_tree(norma_visitata())
+    assert text.startswith("Art. 1")
+    assert tree == (["1", "2"], 0)
+
+def test_raising_helpers(pages):
+    pages.append(MAINTENANCE_PAGE)
+    with pytest.raises(MarkupError):
+        xlm_htmlextractor.fetch_article_and_tree(URN)
+    with pytest.raises(MarkupError):
+        xlm_htmlextractor.estrai_articolo(MAINTENANCE_PAGE)
+
+def test_legacy_estrai_da_html_returns_a_message():
+    xlm_htmlextractor.estrai_da_html.cache_clear()
+    assert xlm_htmlextractor.estrai_da_html(MAINTENANCE_PAGE).startswith("Errore generico")
+
+def test_only_successful_extractions_are_indexed(pages, monkeypatch):
+    indexed = []
+    monkeypatch.setattr(xlm_htmlextractor, "index_article", lambda urn, text: indexed.append(text))
+    pages.extend([MAINTENANCE_PAGE, ARTICLE_PAGE])
+    xlm_htmlextractor.extract_article_and_tree(norma_visitata())
+    assert indexed == []
+    xlm_htmlextractor.extract_article_and_tree(norma_visitata())
+    assert len(indexed) == 1 and indexed[0].startswith("Art. 1")
@@ -0,0 +1,19 @@
+import json
+import pytest
+from app import create_app
+from app.scraper.mirror import act_slug, mirror_act
+
+def test_unresolvable_act():
+    with pytest.raises(ValueError, match="Atto non riconosciuto"):
+        act_slug({'tipo_atto': 'legge'})
+    with pytest.raises(ValueError):
+        list(mirror_act({'tipo_atto': 'legge'}))
+
+def test_act_slug():
+    assert act_slug({'tipo_atto': 'codice civile'}) == "stato_regio.decreto_1942-03-16_262_2_vig"
+
+def test_mirror_route_reports_unresolvable_acts():
+    response = create_app().test_client().post('/mirror', json={'tipo_atto': 'legge'})
+    events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert events[-1]['event'] == 'error'
+    assert "Atto non riconosciuto" in events[-1]['error']
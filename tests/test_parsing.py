@@ -0,0 +1,33 @@
+import pytest
+from app.scraper.parsing import parse_html, find, get_text
+
+bs4 = pytest.importorskip("bs4")
+
+ARTICLE_PAGE = """<html><head><title>Normattiva</title><style>p { color: red }</style>
+<script>window.dataLayer = [];</script></head>
+<body><div id="albero"><ul><li class="agg"><a class="numero_articolo">art. 1</a></li></ul></div>
+<div class="bodyTesto"><h2 class="article-num-akn">Art. 1</h2>
+<script type="text/javascript">var x = 1; document.write("<b>x</b>");</script>
+<!-- commento redazionale -->
+<div class="art-commi-div-akn"><div class="art-comma-div-akn"><span class="comma-num-akn">1.</span>
+Le norme &egrave; <i>corporative</i>&nbsp;sono abrogate.<noscript>Abilita JavaScript</noscript></div>
+<template><p>modello</p></template><style>.x { }</style>
+<div class="art-comma-div-akn"><span class="comma-num-akn">2.</span> Secondo <b>comma</b>.</div></div>
+</div></body></html>"""
+
+@pytest.mark.parametrize("xpath, selector", [
+    ("//div[@class='bodyTesto']", {"class_": "bodyTesto"}),
+    ("//div[@id='albero']", {"id": "albero"}),
+    ("//body", {"name": "body"}),
+    ("/html", {"name": "html"}),
+])
+@pytest.mark.parametrize("separator, strip", [("", False), (" ", True), ("\n", False)])
+def test_get_text_matches_beautifulsoup(xpath, selector, separator, strip):
+    expected = bs4.BeautifulSoup(ARTICLE_PAGE, "lxml").find(**selector).get_text(separator, strip=strip)
+    assert get_text(find(parse_html(ARTICLE_PAGE), xpath), separator, strip) == expected
+
+def test_script_content_is_left_out():
+    text = get_text(find(parse_html(ARTICLE_PAGE), "//div[@class='bodyTesto']"))
+    assert text.startswith("Art. 1")
+    assert "var x" not in text
+    assert "modello" not in text
@@ -0,0 +1,95 @@
+import time
+import threading
+from app.scraper.ratelimit import AdaptiveLimiter, RateLimiter, retry_after_seconds
+
+def make_limiter(**kwargs):
+    options = dict(rate=1000, concurrency=4, min_rate=1, max_rate=5000, max_concurrency=64, latency_tolerance=2.0)
+    options.update(kwargs)
+    return AdaptiveLimiter(**options)
+
+def test_concurrency_limit():
+    limiter = make_limiter(concurrency=2)
+    limiter.tokens = 10
+    assert limiter.try_acquire() == 0
+    assert limiter.try_acquire() == 0
+    assert limiter.try_acquire() > 0
+    limiter.release(0.1, 200)
+    assert limiter.try_acquire() == 0
+
+def test_slow_start_then_additive_increase():
+    limiter = make_limiter(concurrency=4, rate=10)
+    limiter.tokens = 10
+    for _ in range(3):
+        limiter.try_acquire()
+        limiter.release(0.1, 200)
+    assert limiter.concurrency == 7
+    assert limiter.rate == 13
+    limiter.try_acquire()
+    limiter.release(0.1, 503)
+    assert limiter.concurrency == 3.5
+    assert limiter.rate == 6.5
+    limiter.tokens = 10
+    limiter.try_acquire()
+    limiter.release(0.1, 200)
+    assert limiter.concurrency == 3.5 + 1 / 3.5
+
+def test_failures_back_off_once_per_round_trip():
+    limiter = make_limiter(concurrency=8, rate=100)
+    limiter.tokens = 10
+    for _ in range(3):
+        limiter.try_acquire()
+    for _ in range(3):
+        limiter.release(0.1, 429)
+    assert limiter.concurrency == 4
+    assert limiter.rate == 50
+
+def test_retry_after_blocks_the_host():
+    limiter = make_limiter()
+    limiter.try_acquire()
+    limiter.release(0.1, 429, retry_after=30)
+    assert limiter.try_acquire() > 29
+
+def test_cancelled_requests_leave_the_limits_alone():
+    limiter = make_limiter(concurrency=4, rate=100)
+    limiter.tokens = 10
+    limiter.try_acquire()
+    limiter.release(0.1, None, cancelled=True)
+    assert limiter.in_flight == 0
+    assert limiter.concurrency == 4
+    assert limiter.rate == 100
+    assert limiter.slow_start
+
+def test_slow_answers_shrink_concurrency():
+    limiter = make_limiter(concurrency=10)
+    limiter.tokens = 10
+    limiter.try_acquire()
+    limiter.release(0.1, 200)
+    limiter.try_acquire()
+    limiter.release(5.0, 200)
+    assert limiter.concurrency == 11 * 0.9
+    assert limiter.rate == 1001
+
+def test_acquire_waits_for_a_released_slot():
+    limiter = make_limiter(concurrency=1)
+    limiter.acquire()
+    acquired = threading.Event()
+    worker = threading.Thread(target=lambda: (limiter.acquire(), acquired.set()))
+    worker.start()
+    assert not acquired.wait(0.1)
+    limiter.release(0.01, 200)
+    assert acquired.wait(1)
+    worker.join()
+
+def test_token_bucket():
+    limiter = RateLimiter(rate=100, burst=2)
+    assert limiter.try_acquire()
+    assert limiter.try_acquire()
+    assert not limiter.try_acquire()
+    time.sleep(0.02)
+    assert limiter.try_acquire()
+
+def test_retry_after_seconds():
+    assert retry_after_seconds("3") == 3.0
+    assert retry_after_seconds("-1") == 0.0
+    assert retry_after_seconds("Wed, 21 Oct 2015 07:28:00 GMT") is None
+    assert retry_after_seconds(None) is None
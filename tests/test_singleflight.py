@@ -0,0 +1,52 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from app.scraper.singleflight import SingleFlight
+
+def blocking(calls, release, result=None, error=None):
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        if error is not None:
+            raise error
+        return result
+    return fn
+
+def test_concurrent_calls_share_one_result():
+    flight = SingleFlight()
+    calls, release = [], threading.Event()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [executor.submit(flight.do, "key", blocking(calls, release, result=object())) for _ in range(8)]
+        while flight._calls.get("key") is None or flight._calls["key"].waiters < 7:
+            pass
+        release.set()
+        results = {id(future.result()) for future in futures}
+    assert len(calls) == 1
+    assert len(results) == 1
+
+def test_concurrent_calls_share_the_exception():
+    flight = SingleFlight()
+    calls, release = [], threading.Event()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(flight.do, "key", blocking(calls, release, error=ValueError("boom")))
+                   for _ in range(4)]
+        while flight._calls.get("key") is None or flight._calls["key"].waiters < 3:
+            pass
+        release.set()
+        for future in futures:
+            with pytest.raises(ValueError):
+                future.result()
+    assert len(calls) == 1
+
+def test_failures_are_not_remembered():
+    flight = SingleFlight()
+    with pytest.raises(ValueError):
+        flight.do("key", lambda: (_ for _ in ()).throw(ValueError("boom")))
+    assert flight.do("key", lambda: 42) == 42
+    assert flight._calls == {}
+
+def test_different_keys_run_separately():
+    flight = SingleFlight()
+    assert flight.do("a", lambda: 1) == 1
+    assert flight.do("b", lambda: 2) == 2
+    assert flight.do("a", lambda x: x, 3) == 3